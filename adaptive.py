@@ -0,0 +1,149 @@
+"""
+自适应采样模块 - 根据信号变化和阈值距离调整采样与记录频率
+"""
+
+import logging
+import threading
+import time
+
+from logsetup import setup_logging
+
+# 配置日志
+setup_logging()
+
+logger = logging.getLogger("Adaptive")
+
+# 各通道对应的控制阈值 (下限键, 上限键)
+THRESHOLD_KEYS = {
+    "air_temperature": ("TEMP_MIN", "TEMP_MAX"),
+    "air_humidity": ("HUMIDITY_MIN", "HUMIDITY_MAX"),
+    "soil_moisture": ("SOIL_MOISTURE_MIN", "SOIL_MOISTURE_MAX"),
+    "light_intensity": ("LIGHT_MIN", "LIGHT_MAX"),
+}
+
+# 通道状态
+ACTIVE = "active"      # 有变化、超出或接近阈值，需要全速采样
+QUIET = "quiet"        # 平稳，可以降低采样频率
+UNKNOWN = "unknown"    # 窗口内样本不足，保持当前频率
+
+
+def near_threshold(value, low, high, margin):
+    """判断数值是否接近阈值区间的上下边界
+
+    Args:
+        margin: 边界附近的范围，取阈值区间宽度的比例
+    """
+    band = abs(high - low) * margin
+    return abs(value - low) <= band or abs(value - high) <= band
+
+
+def classify(window_stats, value, deadband, thresholds, margin):
+    """根据窗口统计判断通道状态
+
+    Args:
+        window_stats: StreamingStats中单个窗口的统计字典
+        value: 当前读数
+        deadband: {"rate": 每分钟变化量上限, "stddev": 标准差上限}，None表示不降频
+        thresholds: (下限, 上限) 或 None
+        margin: 阈值边界范围比例
+
+    Returns:
+        str: ACTIVE / QUIET / UNKNOWN
+    """
+    if deadband is None:
+        return ACTIVE
+    # 阈值只依赖当前读数，先于样本数检查，降频后第一个越界读数就能恢复全速采样
+    if thresholds is not None and value is not None:
+        low, high = thresholds
+        # 超出阈值区间时控制器正在调节该通道，即使读数平稳也保持全速采样
+        if value < low or value > high or near_threshold(value, low, high, margin):
+            return ACTIVE
+    if window_stats["count"] < 2:
+        return UNKNOWN
+    if abs(window_stats["rate"]) > deadband["rate"] or window_stats["stddev"] > deadband["stddev"]:
+        return ACTIVE
+    return QUIET
+
+
+class AdaptiveSampler:
+    """自适应采样控制器
+
+    定期检查每个采集任务对应通道的统计：所有通道都平稳时把该任务的采样周期加倍
+    （最多放大到MAX_SLOWDOWN倍，且统计窗口内至少保留两个样本），
+    任一通道有变化或接近阈值时立即恢复基础周期。
+    记录（环形缓冲区和数据库）的间隔按所有任务中最小的放大倍数同步调整。
+    """
+
+    def __init__(self, scheduler, stats, readings, task_channels, config, thresholds):
+        """初始化
+
+        Args:
+            scheduler: AcquisitionScheduler
+            stats: StreamingStats
+            readings: ReadingsStore
+            task_channels: {任务名: [通道名, ...]}
+            config: SYSTEM_CONFIG["ADAPTIVE_SAMPLING"]
+            thresholds: THRESHOLD_CONFIG（每次评估时读取，运行中修改阈值立即生效）
+        """
+        self.scheduler = scheduler
+        self.stats = stats
+        self.readings = readings
+        self.task_channels = task_channels
+        self.config = config
+        self.thresholds = thresholds
+        self.lock = threading.Lock()
+
+        self.base_periods = {name: scheduler.tasks[name].period for name in task_channels}
+        self.factors = {name: 1 for name in task_channels}
+        self.channel_states = {}
+
+    def _thresholds(self, field):
+        keys = THRESHOLD_KEYS.get(field)
+        if keys is None:
+            return None
+        return self.thresholds[keys[0]], self.thresholds[keys[1]]
+
+    def evaluate(self):
+        """评估一次并调整采样周期（作为采集调度器的任务定期执行）"""
+        window = self.config.get("WINDOW", "1m")
+        deadbands = self.config.get("DEADBANDS", {})
+        margin = self.config.get("THRESHOLD_MARGIN", 0.1)
+        max_factor = self.config.get("MAX_SLOWDOWN", 8)
+        window_seconds = self.stats.windows[window]
+
+        all_stats = self.stats.get_stats(time.monotonic())
+        readings = self.readings.get()
+
+        states = {}
+        for field in all_stats:
+            states[field] = classify(
+                all_stats[field][window], readings.get(field),
+                deadbands.get(field), self._thresholds(field), margin
+            )
+
+        with self.lock:
+            self.channel_states = states
+            for name, channels in self.task_channels.items():
+                task_states = [states.get(field, ACTIVE) for field in channels]
+                factor = self.factors[name]
+                if ACTIVE in task_states:
+                    factor = 1
+                elif all(state == QUIET for state in task_states):
+                    # 窗口内样本少于两个时无法计算变化率，通道会一直停留在UNKNOWN
+                    if self.base_periods[name] * factor * 2 * 2 <= window_seconds:
+                        factor = min(factor * 2, max_factor)
+
+                if factor != self.factors[name]:
+                    logger.info(f"{name} 采样周期调整为 {self.base_periods[name] * factor:g}s ({factor}x)")
+                    self.factors[name] = factor
+                    self.scheduler.set_period(name, self.base_periods[name] * factor)
+
+    def record_factor(self):
+        """记录间隔的放大倍数（只有所有任务都降频时才降低记录频率）"""
+        with self.lock:
+            return min(self.factors.values(), default=1)
+
+    def get_state(self):
+        """获取各任务的放大倍数和各通道状态"""
+        with self.lock:
+            return {"factors": dict(self.factors), "channels": dict(self.channel_states)}
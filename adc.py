@@ -0,0 +1,111 @@
+"""
+ADC模块 - ADS1115连续转换模式下的多通道轮询与过采样
+"""
+
+import logging
+import threading
+import time
+
+import numpy as np
+
+from logsetup import setup_logging
+
+# 配置日志
+setup_logging()
+
+logger = logging.getLogger("ADC")
+
+# 各增益对应的满量程电压(V)
+PGA_RANGE = {2 / 3: 6.144, 1: 4.096, 2: 2.048, 4: 1.024, 8: 0.512, 16: 0.256}
+# ADS1115支持的数据速率(SPS)
+DATA_RATES = (8, 16, 32, 64, 128, 250, 475, 860)
+REDUCERS = ("mean", "median")
+
+
+def reduce_codes(codes, reducer="median"):
+    """对一批原始码值求均值或中值"""
+    codes = np.asarray(codes, dtype=np.float64)
+    if reducer == "median":
+        return float(np.median(codes))
+    return float(np.mean(codes))
+
+
+def codes_to_voltage(code, gain=1):
+    """把16位有符号原始码值转换为电压"""
+    return code * PGA_RANGE[gain] / 32767
+
+
+class ADS1115Sampler:
+    """ADS1115多通道过采样器
+
+    ADC工作在连续转换模式，每个周期依次切换P0..P3，每个通道连续取若干个原始码值，
+    对码值求均值/中值后只做一次电压换算。切换通道后等待两个转换周期让新结果生效。
+    """
+
+    def __init__(self, ads, channels, data_rate=860, samples=8, reducer="median", gain=1):
+        """初始化采样器
+
+        Args:
+            ads: adafruit_ads1x15.ads1115.ADS1115实例
+            channels: {通道名: 引脚编号0-3}
+            data_rate: 转换速率(SPS)
+            samples: 每个通道每周期采集的码值数
+            reducer: mean 或 median
+            gain: PGA增益
+        """
+        from adafruit_ads1x15.ads1x15 import Mode
+        from adafruit_ads1x15.analog_in import AnalogIn
+
+        if data_rate not in DATA_RATES:
+            raise ValueError(f"不支持的数据速率: {data_rate}")
+        if reducer not in REDUCERS:
+            raise ValueError(f"不支持的聚合方式: {reducer}")
+
+        self.ads = ads
+        self.samples = max(1, int(samples))
+        self.reducer = reducer
+        self.gain = gain
+        self.interval = 1.0 / data_rate
+        self.lock = threading.Lock()
+
+        self.ads.gain = gain
+        self.ads.data_rate = data_rate
+        self.ads.mode = Mode.CONTINUOUS
+        self.inputs = {name: AnalogIn(ads, pin) for name, pin in channels.items()}
+
+        # 最近一个周期的结果
+        self.voltages = {name: None for name in channels}
+        self.last_cycle = None
+
+    def _sample_channel(self, analog_in):
+        """连续读取一个通道的原始码值"""
+        codes = []
+        for i in range(self.samples):
+            if i:
+                # 连续模式下寄存器中始终是最近一次转换结果，按转换周期取值避免重复
+                time.sleep(self.interval)
+            codes.append(analog_in.value)
+        return codes
+
+    def read_cycle(self):
+        """轮询所有通道一次
+
+        Returns:
+            dict: {通道名: 电压}，读取失败的通道为None
+        """
+        voltages = {}
+        with self.lock:
+            for name, analog_in in self.inputs.items():
+                try:
+                    codes = self._sample_channel(analog_in)
+                    voltages[name] = codes_to_voltage(reduce_codes(codes, self.reducer), self.gain)
+                except Exception as e:
+                    logger.warning(f"读取ADC通道 {name} 失败: {e}")
+                    voltages[name] = None
+            self.voltages = voltages
+            self.last_cycle = time.time()
+        return dict(voltages)
+
+    def get_voltages(self):
+        """获取最近一个周期各通道的电压（不等待正在进行的周期）"""
+        return dict(self.voltages)
@@ -0,0 +1,304 @@
+"""
+归档模块 - 将过期的传感器数据压缩为按天分段的列式文件
+"""
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+# 导入配置文件
+from config import SYSTEM_CONFIG
+from logsetup import setup_logging
+from storage import LOCAL_OFFSET_MS, SENSOR_FIELDS, bucket_start, to_epoch_ms
+from ringbuffer import to_columns, to_rows
+
+# 配置日志
+setup_logging()
+
+logger = logging.getLogger("Archive")
+
+DAY_MS = 86400 * 1000
+
+# 段文件格式:
+#   文件头: 魔数, 行数, 字段数, 首末时间戳
+#   列索引: 每列(时间戳列 + 各字段)一个 (偏移, 长度)
+#   列数据: 时间戳为二阶差分，浮点为与前值按位异或，按字节平面重排后zlib压缩
+SEGMENT_MAGIC = b"GHSEG001"
+SEGMENT_HEADER = struct.Struct("<8sIIqq")
+SEGMENT_COLUMN = struct.Struct("<QQ")
+SEGMENT_SUFFIX = ".seg"
+
+
+def _shuffle(words):
+    """按字节平面重排64位数组，使高位的零字节连在一起便于压缩"""
+    return words.view(np.uint8).reshape(len(words), 8).T.tobytes()
+
+
+def _unshuffle(data, n):
+    """_shuffle的逆操作，返回小端uint64数组"""
+    planes = np.frombuffer(data, dtype=np.uint8).reshape(8, n)
+    return np.ascontiguousarray(planes.T).view("<u8").ravel()
+
+
+def encode_timestamps(ts_ms):
+    """二阶差分编码时间戳，等间隔采样时几乎全为0"""
+    ts_ms = np.asarray(ts_ms, dtype="<i8")
+    delta = np.diff(ts_ms, prepend=0)
+    dod = np.diff(delta, prepend=0)
+    return zlib.compress(_shuffle(dod.view("<u8")), 6)
+
+
+def decode_timestamps(data, n):
+    """解码二阶差分时间戳"""
+    dod = _unshuffle(zlib.decompress(data), n).view("<i8")
+    return np.cumsum(np.cumsum(dod))
+
+
+def encode_floats(values):
+    """与前一个值按位异或编码浮点数，变化缓慢时高位全为0"""
+    bits = np.asarray(values, dtype="<f8").view("<u8")
+    prev = np.concatenate((np.zeros(1, dtype="<u8"), bits[:-1]))
+    return zlib.compress(_shuffle(bits ^ prev), 6)
+
+
+def decode_floats(data, n):
+    """解码异或编码的浮点数"""
+    xored = _unshuffle(zlib.decompress(data), n)
+    return np.bitwise_xor.accumulate(xored).view("<f8")
+
+
+def write_segment(path, ts_ms, values):
+    """写入段文件（先写临时文件再原子替换）
+
+    Args:
+        path: 段文件路径
+        ts_ms: 升序毫秒时间戳数组
+        values: 形状为(n, 字段数)的浮点数组，缺失值为NaN
+    """
+    n = len(ts_ms)
+    columns = [encode_timestamps(ts_ms)]
+    columns += [encode_floats(values[:, i]) for i in range(values.shape[1])]
+
+    offset = SEGMENT_HEADER.size + SEGMENT_COLUMN.size * len(columns)
+    index = []
+    for column in columns:
+        index.append(SEGMENT_COLUMN.pack(offset, len(column)))
+        offset += len(column)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, n, values.shape[1], int(ts_ms[0]), int(ts_ms[-1])))
+        f.write(b"".join(index))
+        for column in columns:
+            f.write(column)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class Segment:
+    """内存映射的只读段文件"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.rows, n_fields, self.first_ms, self.last_ms = SEGMENT_HEADER.unpack_from(self.mm, 0)
+        if magic != SEGMENT_MAGIC or n_fields != len(SENSOR_FIELDS):
+            self.mm.close()
+            raise ValueError(f"无效的段文件: {path}")
+        self.columns = [
+            SEGMENT_COLUMN.unpack_from(self.mm, SEGMENT_HEADER.size + i * SEGMENT_COLUMN.size)
+            for i in range(n_fields + 1)
+        ]
+
+    def _column(self, i):
+        offset, length = self.columns[i]
+        return self.mm[offset:offset + length]
+
+    def read(self, start_ms=None, end_ms=None):
+        """读取时间范围内的数据
+
+        Returns:
+            (ts_ms, values): 时间戳数组和二维数值数组
+        """
+        ts_ms = decode_timestamps(self._column(0), self.rows)
+        i = 0 if start_ms is None else np.searchsorted(ts_ms, start_ms, side="left")
+        j = self.rows if end_ms is None else np.searchsorted(ts_ms, end_ms, side="left")
+        if i >= j:
+            return ts_ms[:0], np.empty((0, len(SENSOR_FIELDS)))
+        values = np.column_stack([
+            decode_floats(self._column(k + 1), self.rows)[i:j]
+            for k in range(len(SENSOR_FIELDS))
+        ])
+        return ts_ms[i:j], values
+
+    def close(self):
+        self.mm.close()
+
+
+class SegmentArchive:
+    """按天分段的冷数据归档
+
+    compact()把超过保留期的sensor_data行写入段文件并从数据库删除，
+    query()读取与时间范围重叠的段，供历史查询与热数据拼接。
+    """
+
+    def __init__(self, archive_dir=None, retention_days=None):
+        """初始化归档
+
+        Args:
+            archive_dir: 段文件目录
+            retention_days: 数据库中保留多少天的原始数据
+        """
+        self.archive_dir = str(archive_dir or SYSTEM_CONFIG["ARCHIVE_DIR"])
+        self.retention_days = retention_days or SYSTEM_CONFIG.get("ARCHIVE_AFTER_DAYS", 30)
+        os.makedirs(self.archive_dir, exist_ok=True)
+
+        # 已映射的段文件缓存: 路径 -> (mtime, Segment)
+        self.segments = {}
+        self.lock = threading.Lock()
+
+    def _segment_path(self, day_ms):
+        day = datetime.fromtimestamp(day_ms / 1000).strftime("%Y%m%d")
+        return os.path.join(self.archive_dir, f"sensor_{day}{SEGMENT_SUFFIX}")
+
+    def _open(self, path):
+        """获取段文件的内存映射，文件被替换后关闭旧映射并重新映射（调用方持有self.lock）"""
+        mtime = os.stat(path).st_mtime_ns
+        cached = self.segments.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        segment = Segment(path)
+        if cached:
+            cached[1].close()
+        self.segments[path] = (mtime, segment)
+        return segment
+
+    def _read_segment(self, path, start_ms, end_ms):
+        """读取单个段中落在范围内的数据，不重叠时返回None
+
+        映射和读取都在锁内进行，其他线程替换段文件时不会关闭正在读取的映射。
+        """
+        with self.lock:
+            segment = self._open(path)
+            if segment.last_ms < start_ms or (end_ms is not None and segment.first_ms >= end_ms):
+                return None
+            return segment.read(start_ms, end_ms)
+
+    def close(self):
+        """关闭所有缓存的段文件映射"""
+        with self.lock:
+            for _, segment in self.segments.values():
+                segment.close()
+            self.segments = {}
+
+    def iter_segments(self, start_ms, end_ms=None):
+        """逐段读取时间范围内的归档数据
+
+        Yields:
+            (ts_ms, values): 每个段中落在范围内的数据，按时间升序
+        """
+        # 按文件名中的日期粗筛（留一天余量），再按段头中的实际时间范围精筛
+        first_day = datetime.fromtimestamp((start_ms - DAY_MS) / 1000).strftime("%Y%m%d")
+        last_day = None if end_ms is None else datetime.fromtimestamp((end_ms + DAY_MS) / 1000).strftime("%Y%m%d")
+
+        for name in sorted(os.listdir(self.archive_dir)):
+            if not (name.startswith("sensor_") and name.endswith(SEGMENT_SUFFIX)):
+                continue
+            day = name[len("sensor_"):-len(SEGMENT_SUFFIX)]
+            if day < first_day or (last_day is not None and day > last_day):
+                continue
+            try:
+                part = self._read_segment(os.path.join(self.archive_dir, name), start_ms, end_ms)
+            except Exception as e:
+                logger.error(f"读取归档段 {name} 失败: {e}")
+                continue
+            if part is not None and len(part[0]):
+                yield part
+
+    def query(self, start_ms, end_ms=None):
+        """读取时间范围内的归档数据
+
+        Returns:
+            (ts_ms, values): 按时间升序的数组
+        """
+        parts = list(self.iter_segments(start_ms, end_ms))
+        if not parts:
+            return np.empty(0, dtype=np.int64), np.empty((0, len(SENSOR_FIELDS)))
+        return (np.concatenate([ts_ms for ts_ms, _ in parts]),
+                np.concatenate([values for _, values in parts]))
+
+    def iter_rows(self, start_ms, end_ms=None, chunk_size=500):
+        """分块迭代归档数据，每次只解码一个段
+
+        Yields:
+            list: (ts_ms, timestamp, 各字段值...) 元组列表
+        """
+        for ts_ms, values in self.iter_segments(start_ms, end_ms):
+            for i in range(0, len(ts_ms), chunk_size):
+                yield to_rows(ts_ms[i:i + chunk_size], values[i:i + chunk_size], LOCAL_OFFSET_MS)
+
+    def query_columns(self, start_ms, end_ms=None):
+        """读取归档数据并转换为与数据库查询一致的列式字典"""
+        ts_ms, values = self.query(start_ms, end_ms)
+        return to_columns(ts_ms, values, SENSOR_FIELDS, LOCAL_OFFSET_MS)
+
+    def compact(self, conn):
+        """把超过保留期的原始数据移入段文件
+
+        在数据库写入线程中调用；每天的数据单独写入并删除，
+        已存在的段文件会与新数据合并（按时间戳去重）。
+
+        Returns:
+            int: 归档的行数
+        """
+        cutoff_ms = bucket_start(to_epoch_ms() - self.retention_days * DAY_MS, DAY_MS)
+        archived = 0
+
+        while True:
+            oldest = conn.execute(
+                "SELECT min(ts_ms) FROM sensor_data WHERE ts_ms < ?", (cutoff_ms,)
+            ).fetchone()[0]
+            if oldest is None:
+                break
+
+            day_ms = bucket_start(oldest, DAY_MS)
+            rows = conn.execute(f'''
+            SELECT ts_ms, {", ".join(SENSOR_FIELDS)}
+            FROM sensor_data
+            WHERE ts_ms >= ? AND ts_ms < ?
+            ORDER BY ts_ms
+            ''', (day_ms, day_ms + DAY_MS)).fetchall()
+
+            table = np.array(rows, dtype=np.float64)
+            ts_ms = np.array([row[0] for row in rows], dtype=np.int64)
+            values = table[:, 1:]
+
+            path = self._segment_path(day_ms)
+            if os.path.exists(path):
+                segment = Segment(path)
+                old_ts, old_values = segment.read()
+                segment.close()
+                ts_ms = np.concatenate((old_ts, ts_ms))
+                values = np.concatenate((old_values, values))
+                # 按时间戳排序去重，保留后写入的数据
+                order = np.argsort(ts_ms, kind="stable")[::-1]
+                _, keep = np.unique(ts_ms[order], return_index=True)
+                ts_ms, values = ts_ms[order][keep], values[order][keep]
+
+            write_segment(path, ts_ms, values)
+            with conn:
+                conn.execute(
+                    "DELETE FROM sensor_data WHERE ts_ms >= ? AND ts_ms < ?",
+                    (day_ms, day_ms + DAY_MS)
+                )
+            archived += len(rows)
+            logger.info(f"已归档 {len(rows)} 行数据到 {os.path.basename(path)}")
+
+        return archived
@@ -14,19 +14,71 @@ import numpy as np
 
 # 导入配置文件
 from config import SYSTEM_CONFIG
+from logsetup import setup_logging
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(SYSTEM_CONFIG["LOG_FILE"]),
-        logging.StreamHandler()
-    ]
-)
+setup_logging()
 
 logger = logging.getLogger("CameraModule")
 
+# MJPEG流中每帧的分段头
+MJPEG_PART_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+
+
+class FrameBroadcaster:
+    """最新JPEG帧的发布点
+
+    每帧只编码一次，保存为不可变的bytes并递增序号，同时预先拼好MJPEG分段，
+    所有观看者共享同一个对象，不需要各自复制。观看者在条件变量上等待新序号，
+    处理不过来时直接拿最新帧，跳过中间的旧帧。
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.seq = 0
+        self.frame = None
+        self.chunk = None
+        self.timestamp = None
+
+    def publish(self, frame):
+        """发布新帧
+
+        Args:
+            frame: JPEG数据(bytes)
+
+        Returns:
+            int: 新帧的序号
+        """
+        chunk = MJPEG_PART_HEADER + frame + b'\r\n'
+        with self.condition:
+            self.seq += 1
+            self.frame = frame
+            self.chunk = chunk
+            self.timestamp = time.time()
+            self.condition.notify_all()
+            return self.seq
+
+    def get(self):
+        """获取最新帧 (序号, JPEG数据)，还没有帧时数据为None"""
+        with self.condition:
+            return self.seq, self.frame
+
+    def wait_for_chunk(self, after_seq, timeout=None):
+        """等待序号大于after_seq的帧
+
+        Args:
+            after_seq: 调用方已发送的序号
+            timeout: 最长等待时间(秒)，None为一直等待
+
+        Returns:
+            (序号, MJPEG分段): 超时时返回 (after_seq, None)
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.seq > after_seq, timeout):
+                return after_seq, None
+            return self.seq, self.chunk
+
+
 class CameraModule:
     """摄像头模块类"""
     
@@ -37,8 +89,7 @@ class CameraModule:
         self.camera = None
         self.encoder = None
         self.stream_thread = None
-        self.frame_buffer = io.BytesIO()
-        self.frame_lock = threading.Lock()
+        self.frames = FrameBroadcaster()
         self.running = False
         
         try:
@@ -111,11 +162,11 @@ class CameraModule:
                 # 创建图像对象
                 image = Image.fromarray(corrected_frame)
                 
-                # 安全地更新帧缓冲区
-                with self.frame_lock:
-                    self.frame_buffer.seek(0)
-                    self.frame_buffer.truncate()
-                    image.save(self.frame_buffer, format="JPEG", quality=85)
+                # 编码一次，发布给所有观看者
+                buffer = io.BytesIO()
+                image.save(buffer, format="JPEG", quality=85)
+                frame_data = buffer.getvalue()
+                self.frames.publish(frame_data)
                 
                 # 控制帧率
                 time.sleep(1.0 / SYSTEM_CONFIG["CAMERA_FRAMERATE"])
@@ -129,11 +180,8 @@ class CameraModule:
             return None
         
         try:
-            # 安全地获取当前帧的副本
-            with self.frame_lock:
-                frame_data = self.frame_buffer.getvalue()
-            
-            return frame_data
+            # 帧数据是不可变的bytes，直接返回共享对象
+            return self.frames.get()[1]
         except Exception as e:
             logger.error(f"获取视频帧失败: {e}")
             return None
@@ -20,19 +20,14 @@ logs_dir.mkdir(exist_ok=True)
 
 # 导入本地项目模块
 from config import SYSTEM_CONFIG, CLOUD_CONFIG, THRESHOLD_CONFIG
+from logsetup import setup_logging
+from eventbus import bus, ACTUATOR_CHANGE, COALESCE, COMMAND_RECEIVED
 from sensors import SensorModule
 from controllers import ControllerModule
 from camera import CameraModule
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(SYSTEM_CONFIG["LOG_FILE"]),
-        logging.StreamHandler()
-    ]
-)
+setup_logging()
 
 logger = logging.getLogger("CloudClient")
 
@@ -117,6 +112,7 @@ def setup_socketio():
     @sio.event
     def control_command(command):
         logger.info(f"收到控制命令: {command}")
+        bus.publish(COMMAND_RECEIVED, {"source": "cloud", "command": command.get('command'), "data": command})
         result = {'command_id': command['command_id'], 'success': True}
 
         try:
@@ -197,9 +193,14 @@ def push_camera_data():
 def start_data_push():
     """启动数据推送线程"""
     def data_loop():
-        while running and sio.connected:
-            push_sensor_data()
-            time.sleep(CLOUD_CONFIG["PUSH_INTERVAL"])
+        # 执行器状态变化时提前推送，不必等满推送间隔
+        actuator_events = bus.subscribe("cloud_client", [ACTUATOR_CHANGE], maxsize=1, policy=COALESCE)
+        try:
+            while running and sio.connected:
+                push_sensor_data()
+                actuator_events.get(timeout=CLOUD_CONFIG["PUSH_INTERVAL"])
+        finally:
+            actuator_events.close()
 
     thread = threading.Thread(target=data_loop)
     thread.daemon = True
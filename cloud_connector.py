@@ -13,16 +13,11 @@ from datetime import datetime
 
 # 导入配置文件
 from config import CLOUD_CONFIG, SYSTEM_CONFIG
+from logsetup import setup_logging
+from eventbus import bus, ACTUATOR_CHANGE, COALESCE, COMMAND_RECEIVED
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(SYSTEM_CONFIG["LOG_FILE"]),
-        logging.StreamHandler()
-    ]
-)
+setup_logging()
 
 logger = logging.getLogger("CloudConnector")
 
@@ -59,6 +54,7 @@ class CloudConnector:
         # 运行状态
         self.running = False
         self.push_thread = None
+        self.actuator_events = None
         
         # 摄像头流配置
         self.enable_camera_stream = camera_module is not None
@@ -83,6 +79,10 @@ class CloudConnector:
         
         # 启动数据推送线程
         self.running = True
+        # 执行器状态变化时提前推送，不必等满推送间隔
+        self.actuator_events = bus.subscribe(
+            "cloud_connector", [ACTUATOR_CHANGE], maxsize=1, policy=COALESCE
+        )
         self.push_thread = threading.Thread(target=self._push_data_loop)
         self.push_thread.daemon = True
         self.push_thread.start()
@@ -142,7 +142,8 @@ class CloudConnector:
         while self.running:
             try:
                 # 获取传感器数据
-                sensor_data = self.sensor_module.get_latest_readings()
+                # 读数快照为只读，推送前复制一份再做换算
+                sensor_data = dict(self.sensor_module.get_latest_readings())
                 if 'soil_moisture' in sensor_data:
                     sensor_data['soil_moisture'] = 100 - sensor_data['soil_moisture']
                 
@@ -181,8 +182,9 @@ class CloudConnector:
                     self._check_control_commands()
                     last_command_check = current_time
                 
-                # 等待下一次推送
-                time.sleep(self.push_interval)
+                # 等待下一次推送，执行器状态变化时提前推送
+                if self.actuator_events.get(timeout=self.push_interval) is not None:
+                    self.actuator_events.drain()
                 
             except Exception as e:
                 logger.error(f"数据推送循环异常: {e}")
@@ -245,7 +247,7 @@ class CloudConnector:
                 headers['Auth-Token'] = self.auth_token
                 
             url = f"{self.server_url}/api/camera/frame-push"
-            logger.info(f"推送图像到: {url}, 设备ID: {self.device_id}")
+            logger.debug(f"推送图像到: {url}, 设备ID: {self.device_id}")
             logger.debug(f"请求头: {headers}")
             
             try:
@@ -256,7 +258,7 @@ class CloudConnector:
                     timeout=10
                 )
                 
-                logger.info(f"服务器响应状态码: {response.status_code}")
+                logger.debug(f"服务器响应状态码: {response.status_code}")
                 logger.debug(f"服务器响应内容: {response.text}")
                 
                 if response.status_code == 200:
@@ -345,6 +347,7 @@ class CloudConnector:
                 cmd_data = command.get('data')
                 
                 logger.info(f"收到云端控制命令: {cmd_type}")
+                bus.publish(COMMAND_RECEIVED, {"source": "cloud", "command": cmd_type, "data": cmd_data})
                 
                 if cmd_type == 'mode':
                     auto_mode = cmd_data.get('auto_mode', True)
@@ -399,6 +402,8 @@ class CloudConnector:
         """停止数据推送服务"""
         logger.info("正在停止云服务连接器...")
         self.running = False
+        if self.actuator_events is not None:
+            self.actuator_events.close()
         
         # 清理摄像头进程
         self._cleanup_camera_processes()
@@ -36,14 +36,96 @@ I2C_CONFIG = {
 
 # 系统配置
 SYSTEM_CONFIG = {
-    "READING_INTERVAL": 2.0,    # 传感器读取间隔(秒)
-    "CONTROL_INTERVAL": 5.0,    # 控制循环间隔(秒)
-    "DATA_SAVE_INTERVAL": 300,  # 数据保存间隔(秒)
+    "READING_INTERVAL": 2.0,    # 读数记录间隔(秒)，各传感器的采集周期见SENSOR_SCHEDULE
+    "DHT11_BACKEND": "pigpio",  # DHT11读取方式: pigpio(硬件定时边沿采集，需运行pigpiod) / gpio(Python直接读取)
+    "PWM_BACKEND": "pigpio",    # 风扇和舵机PWM: pigpio(硬件/DMA定时，不可用时退回rpi_gpio) / sysfs(内核PWM) / rpi_gpio(软件PWM) / fake(不操作硬件)
+    "FAN_ACTIVE_LOW": True,     # 风扇继电器/驱动为低电平触发时PWM占空比反相（见GPIO_CONFIG["RELAY_FAN"]）
+    # sysfs后端的 BCM引脚 -> (pwmchip, 通道)，未列出的引脚使用RPi.GPIO软件PWM。
+    # GPIO12/18同属通道0、GPIO13/19同属通道1，每个通道只能配置一个引脚；
+    # 默认只把舵机(GPIO12)放到硬件通道0，需启用 dtoverlay=pwm,pin=12,func=4
+    "PWM_SYSFS_CHANNELS": {
+        12: (0, 0),
+    },
+    "CONTROL_MODE": "event",    # 控制方式: event(收到新读数立即执行控制规则) / poll(按CONTROL_INTERVAL定时执行)
+    "CONTROL_INTERVAL": 5.0,    # poll模式的控制循环间隔(秒)
+    "CONTROL_WATCHDOG_INTERVAL": 30.0,  # event模式下超过该时间(秒)未收到新读数时，按当前读数执行一次控制
+
+    # 各传感器独立采集的周期和单次读取超时(秒)，慢速设备不会拖慢其他传感器
+    "SENSOR_SCHEDULE": {
+        "dht11": {"period": 3.0, "timeout": 1.0},             # DHT11两次读取至少间隔2秒
+        "adc": {"period": 0.1, "timeout": 0.5},               # ADS1115全部通道，10Hz轮询
+        "soil_temperature": {"period": 5.0, "timeout": 4.0},  # DS18B20转换约750ms，不支持批量转换时逐个转换
+    },
+
+    # 自适应采样：1分钟窗口内变化率和标准差都低于死区且不接近THRESHOLD_CONFIG边界时逐步降频
+    "ADAPTIVE_SAMPLING": {
+        "ENABLED": False,            # 默认关闭，启用后各采集任务可能降频
+        "CHECK_INTERVAL": 10.0,      # 评估间隔(秒)
+        "WINDOW": "1m",              # 使用的统计窗口(须在STATS_WINDOWS中)
+        "MAX_SLOWDOWN": 8,           # 采样/记录周期最多放大的倍数
+        "THRESHOLD_MARGIN": 0.1,     # 距阈值边界在阈值区间宽度的该比例内视为接近
+        "DEADBANDS": {               # 死区: rate为每分钟变化量，stddev为标准差
+            "air_temperature": {"rate": 0.2, "stddev": 0.2},
+            "air_humidity": {"rate": 1.0, "stddev": 1.0},
+            "soil_moisture": {"rate": 0.5, "stddev": 0.5},
+            "soil_temperature": {"rate": 0.1, "stddev": 0.1},
+            "light_intensity": {"rate": 200, "stddev": 100},
+        },
+    },
+
+    "OLED_REFRESH_INTERVAL": 1.0,    # OLED最长刷新间隔(秒)，读数变化时立即刷新
+    "OLED_MIN_INTERVAL": 0.2,        # OLED最短刷新间隔(秒)
+
+    # ADS1115配置（连续转换模式，轮询各通道并过采样）
+    "ADC_CHANNELS": {                # 通道名 -> 输入引脚(P0-P3)
+        "soil_moisture": 0,
+        "light_intensity": 1,
+        "aux_p2": 2,                 # 备用通道，可接其他模拟探头
+        "aux_p3": 3,
+    },
+    "ADC_DATA_RATE": 860,            # 转换速率(SPS): 8/16/32/64/128/250/475/860
+    "ADC_OVERSAMPLE": 8,             # 每通道每周期采集的码值数
+    "ADC_REDUCER": "median",         # 码值聚合方式: median(抗尖峰) / mean(降噪)
+
+    # DS18B20配置（1-Wire总线上可接多个探头）
+    "W1_DEVICES_DIR": "/sys/bus/w1/devices",  # 1-Wire设备目录
+    "SOIL_TEMPERATURE_PROBE": "",    # 作为soil_temperature记录的探头ID(如28-0316a2793cff)，留空使用第一个
+
+    "DATA_SAVE_INTERVAL": 300,  # 数据保存间隔(秒)，批量写入后可设为READING_INTERVAL按全分辨率记录
     "LOG_FILE": PROJECT_ROOT / "logs" / "system.log",  # 日志文件路径
+    "LOG_LEVEL": "INFO",        # 日志级别
+    "LOG_MAX_BYTES": 5 * 1024 * 1024,  # 单个日志文件最大字节数，超过后轮转并gzip压缩
+    "LOG_BACKUP_COUNT": 5,      # 保留的历史日志文件数
+    "LOG_QUEUE_SIZE": 10000,    # 日志队列长度，满时丢弃新日志而不阻塞业务线程
+    "LOG_RATE_BURST": 5,        # 同一位置每个周期内正常输出的日志条数
+    "LOG_RATE_PERIOD": 60.0,    # 限流周期(秒)
+    "LOG_RATE_SAMPLE": 100,     # 超出后每多少条输出1条
     "DATABASE_FILE": PROJECT_ROOT / "data" / "greenhouse.db",  # 数据库文件路径
+
+    # 数据库写入配置（后台线程批量提交）
+    "DB_SYNCHRONOUS": "NORMAL",     # SQLite同步级别: NORMAL(WAL下断电最多丢失最近一批) / OFF(最快) / FULL
+    "DB_COMMIT_INTERVAL": 30.0,     # 最长提交间隔(秒)
+    "DB_COMMIT_BATCH_SIZE": 50,     # 累积多少行立即提交
+    "DB_WRITER_QUEUE_SIZE": 1000,   # 写入队列最大行数，满时丢弃最旧数据
+    "HISTORY_MAX_POINTS": 500,      # 历史查询auto分辨率下的最大返回点数
+    "RING_BUFFER_HOURS": 24,        # 内存环形缓冲区保存最近多少小时的读数
+    "STATS_WINDOWS": {"1m": 60, "15m": 900, "1h": 3600},  # 流式统计的窗口(秒)
+
+    # 冷数据归档配置
+    "ARCHIVE_DIR": PROJECT_ROOT / "data" / "archive",  # 压缩段文件目录
+    "ARCHIVE_AFTER_DAYS": 30,       # 原始数据在数据库中保留的天数，之后移入段文件(0为不归档)
+    "ARCHIVE_CHECK_INTERVAL": 3600, # 归档检查间隔(秒)
     
     # Web服务器配置
     "WEB_PORT": 8000,          # Web服务器端口
+    "WEB_SERVER_MODE": "eventlet",  # Web服务器模式: eventlet(协程，支持大量长连接) / threading(Werkzeug开发服务器，每个连接一个线程)
+    "WEB_MAX_CONNECTIONS": 500,  # eventlet模式下同时处理的最大连接数
+    "WEB_RESPONSE_CACHE_SIZE": 16,  # 缓存的API响应数量（当前数据和不同参数的历史数据）
+    "WEB_PUSH_INTERVAL": 3.0,  # 传感器读数的状态推送间隔(秒)
+    "WEB_PUSH_MIN_INTERVAL": 1.0,  # 执行器状态变化推送的最短间隔(秒)，期间的变化合并推送
+    "WEB_PUSH_COALESCE_WINDOW": 0.1,  # 控制命令后的状态推送合并窗口(秒)
+    "WEB_STATS_INTERVAL": 30.0,  # 增量模式下滚动统计(statistics)的推送间隔(秒)
+    "WEB_PUSH_DELTA": True,    # 连接时发送完整状态，之后只推送变化的字段(status_delta)
     "ENABLE_CAMERA": True,     # 是否启用摄像头
     "CAMERA_RESOLUTION": (640, 480),  # 摄像头分辨率
     "CAMERA_FRAMERATE": 24,    # 摄像头帧率
@@ -56,6 +138,8 @@ SYSTEM_CONFIG = {
     "SERVO_MAX_PULSE": 2500,   # 舵机最大脉冲宽度 (微秒)
     "SERVO_MIN_ANGLE": 0,      # 舵机最小角度
     "SERVO_MAX_ANGLE": 180,    # 舵机最大角度
+    "SERVO_STEP_ANGLE": 2,     # 平滑移动每步的角度
+    "SERVO_STEP_INTERVAL": 0.02,  # 平滑移动每步的间隔(秒)
 }
 
 # 阈值配置
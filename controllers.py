@@ -6,23 +6,24 @@ import time
 import threading
 import logging
 import RPi.GPIO as GPIO
+from collections import deque
 from datetime import datetime
 
 # 导入配置文件
 from config import GPIO_CONFIG, THRESHOLD_CONFIG, SYSTEM_CONFIG
+from logsetup import setup_logging
+from eventbus import bus, ACTUATOR_CHANGE, SENSOR_SAMPLE, COALESCE
+from servo import ServoMotionPlanner
+from pwm import create_pwm
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(SYSTEM_CONFIG["LOG_FILE"]),
-        logging.StreamHandler()
-    ]
-)
+setup_logging()
 
 logger = logging.getLogger("ControllerModule")
 
+# 保留最近多少次控制决策的延迟用于统计
+LATENCY_SAMPLES = 200
+
 class ControllerModule:
     """控制器模块类"""
     
@@ -49,23 +50,20 @@ class ControllerModule:
         GPIO.setmode(GPIO.BCM)
         GPIO.setwarnings(False)
     
-        # **重要：先添加舵机控制锁，然后才能初始化舵机**
-        self.servo_lock = threading.Lock()
-        self.target_angle = None
+        # 舵机由运动规划线程驱动，初始化失败时为None
+        self.servo_planner = None
     
-        # 初始化风扇控制 (使用PWM)
-        GPIO.setup(GPIO_CONFIG["RELAY_FAN"], GPIO.OUT)
-        self.fan_pwm = GPIO.PWM(GPIO_CONFIG["RELAY_FAN"], 100)  # 100Hz PWM频率
-        self.fan_pwm.start(0)  # 初始化为0%占空比（关闭）
+        # 初始化风扇控制 (使用PWM，后端见SYSTEM_CONFIG["PWM_BACKEND"])
+        self.fan_pwm = create_pwm(GPIO_CONFIG["RELAY_FAN"], 100)  # 100Hz PWM频率
+        self.fan_pwm.start(self._fan_duty(0))  # 初始化为关闭
     
-        # 初始化SG90舵机 - 使用软件PWM
+        # 初始化SG90舵机
         try:
-            GPIO.setup(GPIO_CONFIG["SERVO_PIN"], GPIO.OUT)
-            self.servo_pwm = GPIO.PWM(GPIO_CONFIG["SERVO_PIN"], 50)  # 50Hz
+            self.servo_pwm = create_pwm(GPIO_CONFIG["SERVO_PIN"], 50, servo=True)  # 50Hz
             self.servo_pwm.start(0)
         
             # 设置初始位置（90度）
-            self.set_servo_angle(90)
+            self.servo_pwm.ChangeDutyCycle(self._angle_to_duty_cycle(90))
             time.sleep(0.5)  # 等待舵机到位
         
             # 停止PWM信号以防止抖动
@@ -73,6 +71,17 @@ class ControllerModule:
         
             self.device_status["servo"] = True
             self.device_status["servo_angle"] = 90
+            
+            # 启动舵机运动规划线程
+            self.servo_planner = ServoMotionPlanner(
+                self.servo_pwm,
+                self._angle_to_duty_cycle,
+                90,
+                step=SYSTEM_CONFIG.get("SERVO_STEP_ANGLE", 2),
+                step_interval=SYSTEM_CONFIG.get("SERVO_STEP_INTERVAL", 0.02),
+                on_arrive=self._on_servo_arrive
+            )
+            self.servo_planner.start()
             logger.info("舵机初始化成功")
         
         except Exception as e:
@@ -80,6 +89,19 @@ class ControllerModule:
             self.servo_pwm = None
             self.device_status["servo"] = False
     
+        # event模式下订阅新读数，只保留最新一条（控制只关心当前状态）
+        self.event_mode = SYSTEM_CONFIG.get("CONTROL_MODE", "event") == "event"
+        self.samples = None
+        if self.event_mode:
+            self.samples = bus.subscribe("controller", [SENSOR_SAMPLE], maxsize=1, policy=COALESCE)
+    
+        # 控制决策统计
+        self.last_servo_update = 0
+        self.stats_lock = threading.Lock()
+        self.evaluations = 0
+        self.watchdog_runs = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+    
         # 启动控制线程
         self.running = True
         self.control_thread = threading.Thread(target=self._control_loop)
@@ -89,61 +111,124 @@ class ControllerModule:
         logger.info("控制器模块初始化完成")
     
     def _control_loop(self):
-        """控制循环，根据传感器数据自动控制设备"""
-        last_servo_update = 0
+        """控制循环，根据传感器数据自动控制设备
+
+        event模式下每收到新的读数快照立即执行控制规则，慢速定时器只作为看门狗：
+        超过CONTROL_WATCHDOG_INTERVAL未收到新读数时按当前读数执行一次。
+        poll模式按CONTROL_INTERVAL定时执行。
+        """
+        watchdog_interval = SYSTEM_CONFIG.get("CONTROL_WATCHDOG_INTERVAL", 30.0)
         
         while self.running:
             try:
-                if self.auto_mode:
+                if self.event_mode:
+                    event = self.samples.get(timeout=watchdog_interval)
+                    if not self.running:
+                        break
+                    if event is None:
+                        with self.stats_lock:
+                            self.watchdog_runs += 1
+                        logger.warning(f"超过{watchdog_interval:g}秒未收到新的传感器数据，按当前读数执行控制")
+                        readings = self.sensor_module.get_latest_readings()
+                    else:
+                        readings = event.data
+                else:
                     # 获取最新的传感器读数
                     readings = self.sensor_module.get_latest_readings()
-                    current_time = time.time()
-                    
-                    # 控制风扇（基于温度）
-                    if readings["air_temperature"] > THRESHOLD_CONFIG["TEMP_MAX"]:
-                        # 计算风扇速度百分比（随温度增加而提高）
-                        temp_diff = readings["air_temperature"] - THRESHOLD_CONFIG["TEMP_MIN"]
-                        temp_range = THRESHOLD_CONFIG["TEMP_MAX"] - THRESHOLD_CONFIG["TEMP_MIN"]
-                        
-                        if temp_range > 0:
-                            speed_percent = min(100, int((temp_diff / temp_range) * 100))
-                        else:
-                            speed_percent = 100
-                        
-                        self.set_fan_speed(speed_percent)
-                    elif readings["air_temperature"] < THRESHOLD_CONFIG["TEMP_MIN"]:
-                        # 温度低于阈值，关闭风扇
-                        self.set_fan_speed(0)
-                    
-                    # 舵机控制（减少更新频率）
-                    if self.device_status["servo"] and self.servo_pwm is not None:
-                        # 每30秒才更新一次舵机位置
-                        if current_time - last_servo_update >= 30:
-                            if readings["light_intensity"] > THRESHOLD_CONFIG["LIGHT_MAX"]:
-                                target_angle = 0  # 关闭百叶窗
-                            elif readings["light_intensity"] < THRESHOLD_CONFIG["LIGHT_MIN"]:
-                                target_angle = 180  # 打开百叶窗
-                            else:
-                                # 根据光照强度线性控制
-                                light_range = THRESHOLD_CONFIG["LIGHT_MAX"] - THRESHOLD_CONFIG["LIGHT_MIN"]
-                                if light_range > 0:
-                                    percentage = (readings["light_intensity"] - THRESHOLD_CONFIG["LIGHT_MIN"]) / light_range
-                                    target_angle = int(180 * (1 - percentage))
-                                else:
-                                    target_angle = 90
-                            
-                            # 只有角度变化超过5度才执行移动
-                            if abs(self.device_status["servo_angle"] - target_angle) > 5:
-                                self.set_servo_angle(target_angle)
-                                last_servo_update = current_time
                 
-                # 增加控制循环间隔
-                time.sleep(SYSTEM_CONFIG.get("CONTROL_INTERVAL", 10))
+                if self.auto_mode:
+                    self._apply_rules(readings)
+                
+                if not self.event_mode:
+                    time.sleep(SYSTEM_CONFIG.get("CONTROL_INTERVAL", 10))
                 
             except Exception as e:
                 logger.error(f"控制循环异常: {e}")
                 time.sleep(5)  # 出错后等待5秒再尝试
     
+    def _apply_rules(self, readings):
+        """按阈值执行一次控制规则，并记录从读数产生到执行器写入的延迟"""
+        current_time = time.time()
+        fan_speed = self.device_status["fan_speed"]
+        servo_target = self.get_servo_target()
+        
+        # 控制风扇（基于温度）
+        if readings["air_temperature"] > THRESHOLD_CONFIG["TEMP_MAX"]:
+            # 计算风扇速度百分比（随温度增加而提高）
+            temp_diff = readings["air_temperature"] - THRESHOLD_CONFIG["TEMP_MIN"]
+            temp_range = THRESHOLD_CONFIG["TEMP_MAX"] - THRESHOLD_CONFIG["TEMP_MIN"]
+            
+            if temp_range > 0:
+                speed_percent = min(100, int((temp_diff / temp_range) * 100))
+            else:
+                speed_percent = 100
+            
+            self.set_fan_speed(speed_percent)
+        elif readings["air_temperature"] < THRESHOLD_CONFIG["TEMP_MIN"]:
+            # 温度低于阈值，关闭风扇
+            self.set_fan_speed(0)
+        
+        # 舵机控制（减少更新频率）
+        if self.device_status["servo"] and self.servo_planner is not None:
+            # 每30秒才更新一次舵机位置
+            if current_time - self.last_servo_update >= 30:
+                if readings["light_intensity"] > THRESHOLD_CONFIG["LIGHT_MAX"]:
+                    target_angle = 0  # 关闭百叶窗
+                elif readings["light_intensity"] < THRESHOLD_CONFIG["LIGHT_MIN"]:
+                    target_angle = 180  # 打开百叶窗
+                else:
+                    # 根据光照强度线性控制
+                    light_range = THRESHOLD_CONFIG["LIGHT_MAX"] - THRESHOLD_CONFIG["LIGHT_MIN"]
+                    if light_range > 0:
+                        percentage = (readings["light_intensity"] - THRESHOLD_CONFIG["LIGHT_MIN"]) / light_range
+                        target_angle = int(180 * (1 - percentage))
+                    else:
+                        target_angle = 90
+                
+                # 只有角度变化超过5度才执行移动
+                if abs(self.get_servo_target() - target_angle) > 5:
+                    self.set_servo_angle(target_angle)
+                    self.last_servo_update = current_time
+        
+        with self.stats_lock:
+            self.evaluations += 1
+            if self.device_status["fan_speed"] != fan_speed or self.get_servo_target() != servo_target:
+                sample_time = self._sample_time(readings)
+                if sample_time is not None:
+                    self.latencies.append(time.time() - sample_time)
+    
+    @staticmethod
+    def _sample_time(readings):
+        """读数快照的产生时间(时间戳)，没有timestamp时返回None"""
+        try:
+            return datetime.fromisoformat(readings["timestamp"]).timestamp()
+        except (KeyError, TypeError, ValueError):
+            return None
+    
+    def get_control_stats(self):
+        """获取控制决策统计
+
+        Returns:
+            dict: 评估次数、看门狗触发次数，以及最近决策的延迟(毫秒)
+        """
+        with self.stats_lock:
+            last = self.latencies[-1] if self.latencies else None
+            latencies = sorted(self.latencies)
+            stats = {
+                "mode": "event" if self.event_mode else "poll",
+                "evaluations": self.evaluations,
+                "watchdog_runs": self.watchdog_runs,
+                "decisions": len(latencies),
+            }
+        if latencies:
+            stats["latency_ms"] = {
+                "last": round(last * 1000, 1),
+                "mean": round(sum(latencies) / len(latencies) * 1000, 1),
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+                "max": round(latencies[-1] * 1000, 1),
+            }
+        return stats
+    
     def set_fan_speed(self, speed_percent):
         """设置风扇速度
         
@@ -153,57 +238,55 @@ class ControllerModule:
         # 确保百分比在合理范围内
         speed_percent = max(0, min(100, speed_percent))
         
+        # 自动控制每次评估都会调用，速度不变时不重复写PWM
+        if self.device_status["fan_speed"] == speed_percent:
+            return
+        
         try:
             # 更新PWM占空比
-            self.fan_pwm.ChangeDutyCycle(speed_percent)
+            self.fan_pwm.ChangeDutyCycle(self._fan_duty(speed_percent))
             
             # 更新状态
             self.device_status["fan_speed"] = speed_percent
             self.device_status["fan"] = speed_percent > 0
             
             logger.debug(f"风扇速度设置为 {speed_percent}%")
+            self._publish_status()
             
         except Exception as e:
             logger.error(f"设置风扇速度失败: {e}")
     
+    def _fan_duty(self, speed_percent):
+        """风扇速度对应的PWM占空比（低电平触发时反相，0%速度输出恒定高电平）"""
+        if SYSTEM_CONFIG.get("FAN_ACTIVE_LOW", True):
+            return 100 - speed_percent
+        return speed_percent
+    
     def set_servo_angle(self, angle):
-        """设置舵机角度（带平滑移动）"""
-        if not self.device_status["servo"] or self.servo_pwm is None:
+        """设置舵机目标角度（非阻塞，由运动规划线程平滑移动）
+
+        移动过程中再次设置会从当前位置直接转向新目标。
+        """
+        if not self.device_status["servo"] or self.servo_planner is None:
             logger.warning("舵机未初始化，无法设置角度")
             return
         
         # 确保角度在合理范围内
         angle = max(0, min(180, angle))
-        
-        try:
-            with self.servo_lock:
-                # 如果角度未改变，则不执行
-                if self.device_status["servo_angle"] == angle:
-                    return
-                
-                # 平滑移动到目标位置
-                current_angle = self.device_status["servo_angle"]
-                step = 2 if angle > current_angle else -2
-                
-                while abs(current_angle - angle) > 1:
-                    current_angle += step
-                    duty_cycle = self._angle_to_duty_cycle(current_angle)
-                    self.servo_pwm.ChangeDutyCycle(duty_cycle)
-                    time.sleep(0.02)  # 控制移动速度
-                
-                # 最终位置
-                duty_cycle = self._angle_to_duty_cycle(angle)
-                self.servo_pwm.ChangeDutyCycle(duty_cycle)
-                time.sleep(0.05)  # 确保到位
-                
-                # 停止PWM信号以防止抖动
-                self.servo_pwm.ChangeDutyCycle(0)
-                
-                self.device_status["servo_angle"] = angle
-                logger.debug(f"舵机角度设置为 {angle}°")
-                
-        except Exception as e:
-            logger.error(f"设置舵机角度失败: {e}")
+        self.servo_planner.set_target(angle)
+        logger.debug(f"舵机目标角度设置为 {angle}°")
+    
+    def get_servo_target(self):
+        """获取舵机目标角度（移动中与当前角度不同）"""
+        if self.servo_planner is None:
+            return self.device_status["servo_angle"]
+        return self.servo_planner.target
+    
+    def _on_servo_arrive(self, angle):
+        """舵机到达目标后更新状态并发布事件"""
+        self.device_status["servo_angle"] = angle
+        logger.debug(f"舵机角度设置为 {angle}°")
+        self._publish_status()
     
     def _angle_to_duty_cycle(self, angle):
         """将角度转换为PWM占空比"""
@@ -216,6 +299,11 @@ class ControllerModule:
         """设置自动/手动模式"""
         self.auto_mode = auto_mode
         logger.info(f"系统模式已设置为: {'自动' if auto_mode else '手动'}")
+        self._publish_status()
+    
+    def _publish_status(self):
+        """执行器状态变化后发布事件"""
+        bus.publish(ACTUATOR_CHANGE, self.get_status())
     
     def get_status(self):
         """获取控制器状态"""
@@ -227,6 +315,7 @@ class ControllerModule:
             "fan_speed": self.device_status["fan_speed"],
             "servo_status": self.device_status["servo"],
             "servo_angle": self.device_status["servo_angle"],
+            "servo_target": self.get_servo_target(),
             "auto_mode": self.auto_mode,
             # 添加设备状态对象，兼容前端预期
             "devices": {
@@ -245,20 +334,21 @@ class ControllerModule:
         
         try:
             if device == "fan":
+                # 风扇引脚由PWM后端占用，开关也通过占空比控制
                 if action == "on":
-                    GPIO.output(GPIO_CONFIG["RELAY_FAN"], GPIO.LOW)  # 低电平触发
+                    self.set_fan_speed(100)
                     self.fan_status = True
                     logger.info("风扇已开启")
                 elif action == "off":
-                    GPIO.output(GPIO_CONFIG["RELAY_FAN"], GPIO.HIGH)  # 高电平关闭
+                    self.set_fan_speed(0)
                     self.fan_status = False
                     logger.info("风扇已关闭")
                 elif action == "set":
                     # 设置风扇状态
-                    GPIO.output(GPIO_CONFIG["RELAY_FAN"], 
-                                GPIO.LOW if value else GPIO.HIGH)
+                    self.set_fan_speed(100 if value else 0)
                     self.fan_status = bool(value)
                     logger.info(f"风扇已设置为 {'开启' if value else '关闭'}")
+                # 状态变化由set_fan_speed发布，这里不重复发布
                 
             elif device == "stepper":
                 if action == "set" and value is not None:
@@ -303,23 +393,25 @@ class ControllerModule:
         """清理资源"""
         logger.info("正在清理控制器模块资源...")
         self.running = False
+        if self.samples is not None:
+            self.samples.close()
         
         if self.control_thread.is_alive():
             self.control_thread.join(timeout=2.0)
         
         # 关闭风扇
         try:
-            self.fan_pwm.ChangeDutyCycle(0)
+            self.fan_pwm.ChangeDutyCycle(self._fan_duty(0))
             self.fan_pwm.stop()
-            GPIO.output(GPIO_CONFIG["RELAY_FAN"], GPIO.LOW)  # 确保风扇关闭
         except:
             pass
         
         # 将舵机平滑回中间位置
-        if self.device_status["servo"] and self.servo_pwm is not None:
+        if self.device_status["servo"] and self.servo_planner is not None:
             try:
                 self.set_servo_angle(90)
-                time.sleep(1)  # 等待移动完成
+                self.servo_planner.wait_idle(timeout=3.0)  # 等待移动完成
+                self.servo_planner.stop()
                 self.servo_pwm.stop()
             except:
                 pass
@@ -0,0 +1,152 @@
+"""
+DHT11模块 - 基于边沿时间戳的DHT11读取与解码
+"""
+
+import logging
+import threading
+import time
+
+from logsetup import setup_logging
+
+# 配置日志
+setup_logging()
+
+logger = logging.getLogger("DHT11")
+
+# 数据位高电平宽度: 约26-28us为0，约70us为1
+BIT_THRESHOLD_US = 50
+# 高电平宽度超过该值视为非数据位（如80us响应脉冲或总线空闲）
+MAX_BIT_US = 100
+# 启动信号低电平时间(秒)
+START_SIGNAL_S = 0.018
+# 一次完整传输约4-5ms，留足余量
+CAPTURE_WINDOW_S = 0.05
+
+
+def high_pulse_widths(edges):
+    """由边沿序列计算每个高电平脉冲的宽度
+
+    Args:
+        edges: [(tick_us, level), ...]，tick为32位微秒计数（允许回绕），level为跳变后的电平
+
+    Returns:
+        list: 高电平宽度(微秒)
+    """
+    widths = []
+    rise = None
+    for tick, level in edges:
+        if level:
+            rise = tick
+        elif rise is not None:
+            widths.append((tick - rise) & 0xFFFFFFFF)
+            rise = None
+    return widths
+
+
+def decode_bits(bits):
+    """把40个数据位解码为湿度和温度
+
+    Returns:
+        (humidity, temperature) 或 None（校验失败）
+    """
+    data = [0] * 5
+    for i, bit in enumerate(bits):
+        data[i // 8] = (data[i // 8] << 1) | bit
+
+    if (sum(data[:4]) & 0xFF) != data[4]:
+        logger.debug(f"DHT11校验失败: calculated={sum(data[:4]) & 0xFF}, received={data[4]}")
+        return None
+
+    # DHT11只使用整数部分
+    humidity = data[0]
+    temperature = data[2]
+    # 负温度处理
+    if data[2] & 0x80:
+        temperature = -(data[2] & 0x7F)
+    return humidity, temperature
+
+
+def decode_dht11(edges):
+    """解码一次DHT11传输的边沿时间戳（纯函数，可用录制的边沿数据测试）
+
+    取最后40个宽度合理的高电平脉冲作为数据位，前面的启动/响应脉冲自动忽略。
+
+    Args:
+        edges: [(tick_us, level), ...]
+
+    Returns:
+        (humidity, temperature) 或 None
+    """
+    widths = [w for w in high_pulse_widths(edges) if w <= MAX_BIT_US]
+    if len(widths) < 40:
+        return None
+    bits = [1 if w > BIT_THRESHOLD_US else 0 for w in widths[-40:]]
+    return decode_bits(bits)
+
+
+class PigpioDHT11Reader:
+    """使用pigpio硬件定时回调采集边沿的DHT11读取器
+
+    pigpio守护进程以微秒精度记录每个边沿，读取期间Python线程只是休眠等待，
+    不占用CPU也不持有GIL，采集完成后再调用decode_dht11解码。
+    """
+
+    def __init__(self, pin, pi=None):
+        """初始化读取器
+
+        Args:
+            pin: DHT11数据引脚(BCM编号)
+            pi: 已连接的pigpio.pi实例，为None时自动连接本地守护进程
+        """
+        import pigpio
+
+        self.pigpio = pigpio
+        self.pin = pin
+        self.pi = pi or pigpio.pi()
+        if not self.pi.connected:
+            raise RuntimeError("无法连接pigpio守护进程，请先运行 sudo pigpiod")
+
+        self.lock = threading.Lock()
+        self.edges = []
+        # 最近一次读取的边沿数据，便于录制和离线分析
+        self.last_edges = []
+
+        self.pi.set_pull_up_down(self.pin, pigpio.PUD_UP)
+
+    def _on_edge(self, gpio, level, tick):
+        """pigpio边沿回调（在pigpio通知线程中执行）"""
+        if level in (0, 1):
+            self.edges.append((tick, level))
+
+    def read(self):
+        """读取一次DHT11
+
+        Returns:
+            (humidity, temperature) 或 None
+        """
+        pigpio = self.pigpio
+        with self.lock:
+            self.edges = []
+            callback = self.pi.callback(self.pin, pigpio.EITHER_EDGE, self._on_edge)
+            try:
+                # 发送启动信号：拉低18ms后释放总线，由上拉电阻拉高
+                self.pi.set_mode(self.pin, pigpio.OUTPUT)
+                self.pi.write(self.pin, 0)
+                time.sleep(START_SIGNAL_S)
+                self.pi.set_mode(self.pin, pigpio.INPUT)
+
+                # 等待传输完成（休眠期间边沿由pigpio记录）
+                time.sleep(CAPTURE_WINDOW_S)
+            finally:
+                callback.cancel()
+
+            self.last_edges = list(self.edges)
+
+        return decode_dht11(self.last_edges)
+
+    def close(self):
+        """释放pigpio连接"""
+        try:
+            self.pi.stop()
+        except Exception:
+            pass
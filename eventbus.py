@@ -0,0 +1,172 @@
+"""
+事件总线模块 - 模块之间的进程内发布/订阅
+"""
+
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+
+from logsetup import setup_logging
+
+# 配置日志
+setup_logging()
+
+logger = logging.getLogger("EventBus")
+
+# 事件类型
+SENSOR_SAMPLE = "sensor_sample"        # 新的读数快照，data为ReadingsSnapshot
+ACTUATOR_CHANGE = "actuator_change"    # 执行器状态变化，data为ControllerModule.get_status()
+COMMAND_RECEIVED = "command_received"  # 收到控制命令，data为 {"source", "command", "data"}
+
+EVENT_TYPES = (SENSOR_SAMPLE, ACTUATOR_CHANGE, COMMAND_RECEIVED)
+
+# 订阅队列满时的处理策略
+DROP_OLDEST = "drop_oldest"  # 丢弃最旧的事件
+COALESCE = "coalesce"        # 同类型事件只保留最新一条
+
+Event = namedtuple("Event", ["type", "data", "seq", "timestamp"])
+
+
+class Subscription:
+    """订阅者的有界事件队列
+
+    发布方只做入队，不会因为订阅者处理慢而阻塞；队列满时按策略丢弃。
+    """
+
+    def __init__(self, bus, name, types, maxsize, policy):
+        self.bus = bus
+        self.name = name
+        self.types = frozenset(types)
+        self.maxsize = maxsize
+        self.policy = policy
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+        self.coalesced = 0
+        self.delivered = 0
+
+    def _put(self, event):
+        with self.condition:
+            if self.policy == COALESCE:
+                # 同类型的旧事件被新事件替换
+                for i, queued in enumerate(self.queue):
+                    if queued.type == event.type:
+                        del self.queue[i]
+                        self.coalesced += 1
+                        break
+            if len(self.queue) >= self.maxsize:
+                self.queue.popleft()
+                self.dropped += 1
+                if self.dropped == 1 or self.dropped % 100 == 0:
+                    logger.warning(f"订阅者 {self.name} 处理过慢，已丢弃 {self.dropped} 个事件")
+            self.queue.append(event)
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        """取出一个事件
+
+        Args:
+            timeout: 最长等待时间(秒)，None为一直等待
+
+        Returns:
+            Event 或 None（超时或已取消订阅）
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.queue or self.closed, timeout):
+                return None
+            if not self.queue:
+                return None
+            self.delivered += 1
+            return self.queue.popleft()
+
+    def drain(self):
+        """取出队列中的全部事件（不等待）"""
+        with self.condition:
+            events = list(self.queue)
+            self.queue.clear()
+            self.delivered += len(events)
+            return events
+
+    def close(self):
+        """取消订阅，并唤醒正在get中等待的线程"""
+        self.bus.unsubscribe(self)
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def get_stats(self):
+        with self.condition:
+            return {
+                "types": sorted(self.types),
+                "policy": self.policy,
+                "pending": len(self.queue),
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+            }
+
+
+class EventBus:
+    """进程内事件总线"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = []
+        self.seq = 0
+
+    def subscribe(self, name, types, maxsize=100, policy=DROP_OLDEST):
+        """订阅事件
+
+        Args:
+            name: 订阅者名称（用于日志和统计）
+            types: 事件类型序列
+            maxsize: 队列最大长度
+            policy: DROP_OLDEST 或 COALESCE
+
+        Returns:
+            Subscription
+        """
+        unknown = set(types) - set(EVENT_TYPES)
+        if unknown:
+            raise ValueError(f"未知的事件类型: {', '.join(sorted(unknown))}")
+        if policy not in (DROP_OLDEST, COALESCE):
+            raise ValueError(f"未知的队列策略: {policy}")
+
+        subscription = Subscription(self, name, types, maxsize, policy)
+        with self.lock:
+            self.subscriptions = self.subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscriptions = [s for s in self.subscriptions if s is not subscription]
+
+    def publish(self, event_type, data=None):
+        """发布事件（非阻塞）
+
+        Returns:
+            Event
+        """
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"未知的事件类型: {event_type}")
+        with self.lock:
+            self.seq += 1
+            event = Event(event_type, data, self.seq, time.time())
+            subscriptions = self.subscriptions
+
+        for subscription in subscriptions:
+            if event_type in subscription.types:
+                subscription._put(event)
+        return event
+
+    def get_stats(self):
+        """获取各订阅者的队列统计"""
+        with self.lock:
+            subscriptions = self.subscriptions
+        return {s.name: s.get_stats() for s in subscriptions}
+
+
+# 全局事件总线
+bus = EventBus()
@@ -0,0 +1,142 @@
+"""
+日志模块 - 统一的非阻塞日志配置
+"""
+
+import atexit
+import gzip
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import threading
+import time
+
+# 导入配置文件
+from config import SYSTEM_CONFIG
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_setup_lock = threading.Lock()
+_listener = None
+
+
+class RateLimitFilter(logging.Filter):
+    """按调用位置限流的日志过滤器
+
+    同一位置(文件+行号)在每个period秒内前burst条正常输出，之后每sample条只输出1条，
+    被抑制的条数附加在下一条输出的消息后面。ERROR及以上级别不限流。
+    """
+
+    def __init__(self, burst=5, period=60.0, sample=100):
+        super().__init__()
+        self.burst = burst
+        self.period = period
+        self.sample = sample
+        self.lock = threading.Lock()
+        # 调用位置 -> [窗口起始时间, 窗口内条数, 被抑制条数]
+        self.sites = {}
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR:
+            return True
+
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self.lock:
+            site = self.sites.get(key)
+            if site is None or now - site[0] >= self.period:
+                suppressed = site[2] if site else 0
+                site = [now, 0, suppressed]
+                self.sites[key] = site
+            site[1] += 1
+
+            count = site[1]
+            if count > self.burst and (count - self.burst) % self.sample != 0:
+                site[2] += 1
+                return False
+
+            suppressed, site[2] = site[2], 0
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} (同一位置另有 {suppressed} 条日志被抑制)"
+            record.args = None
+        return True
+
+
+def _gzip_namer(name):
+    return name + ".gz"
+
+
+def _gzip_rotator(source, dest):
+    """轮转时把旧日志压缩为.gz"""
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """队列满时直接丢弃记录的QueueHandler"""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+def setup_logging():
+    """配置根日志记录器（可重复调用，只在第一次生效）
+
+    业务线程只把日志记录放入内存队列，由QueueListener后台线程写文件和控制台；
+    日志文件按大小轮转并gzip压缩。
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        log_file = SYSTEM_CONFIG["LOG_FILE"]
+        os.makedirs(os.path.dirname(str(log_file)), exist_ok=True)
+
+        formatter = logging.Formatter(LOG_FORMAT)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=SYSTEM_CONFIG.get("LOG_MAX_BYTES", 5 * 1024 * 1024),
+            backupCount=SYSTEM_CONFIG.get("LOG_BACKUP_COUNT", 5),
+            encoding="utf-8"
+        )
+        file_handler.namer = _gzip_namer
+        file_handler.rotator = _gzip_rotator
+        file_handler.setFormatter(formatter)
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(formatter)
+
+        # 队列满时丢弃日志而不是阻塞业务线程
+        log_queue = queue.Queue(SYSTEM_CONFIG.get("LOG_QUEUE_SIZE", 10000))
+        queue_handler = _NonBlockingQueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter(
+            burst=SYSTEM_CONFIG.get("LOG_RATE_BURST", 5),
+            period=SYSTEM_CONFIG.get("LOG_RATE_PERIOD", 60.0),
+            sample=SYSTEM_CONFIG.get("LOG_RATE_SAMPLE", 100)
+        ))
+
+        root = logging.getLogger()
+        root.setLevel(SYSTEM_CONFIG.get("LOG_LEVEL", "INFO"))
+        root.addHandler(queue_handler)
+
+        _listener = logging.handlers.QueueListener(
+            log_queue, file_handler, stream_handler, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging():
+    """停止后台日志线程并写出队列中剩余的日志"""
+    global _listener
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
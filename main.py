@@ -16,16 +16,10 @@ data_dir.mkdir(exist_ok=True)
 
 # 导入配置
 from config import SYSTEM_CONFIG
+from logsetup import setup_logging
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(SYSTEM_CONFIG["LOG_FILE"]),
-        logging.StreamHandler()
-    ]
-)
+setup_logging()
 
 logger = logging.getLogger("Main")
 
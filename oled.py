@@ -0,0 +1,218 @@
+"""
+OLED模块 - 后台线程按需刷新SSD1306显示屏
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from logsetup import setup_logging
+
+# 配置日志
+setup_logging()
+
+logger = logging.getLogger("OLED")
+
+FONT_PATHS = [
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc"
+]
+
+# SSD1306命令
+SET_COL_ADDR = 0x21
+SET_PAGE_ADDR = 0x22
+# I2C数据传输的控制字节
+DATA_CONTROL = 0x40
+
+
+def image_to_pages(pixels, height, width):
+    """把二值像素矩阵转换为SSD1306的页缓冲
+
+    每页8行，每列一个字节，最低位为该页最上面一行。
+
+    Args:
+        pixels: 形状为(height, width)的布尔/0-1数组
+
+    Returns:
+        np.ndarray: 形状为(height // 8, width)的uint8数组
+    """
+    pages = np.asarray(pixels, dtype=bool).reshape(height // 8, 8, width)
+    return np.packbits(pages, axis=1, bitorder="little")[:, 0, :]
+
+
+def dirty_page_runs(old_pages, new_pages):
+    """找出内容变化的连续页区间
+
+    Returns:
+        list: [(起始页, 结束页(含)), ...]，old_pages为None时返回全部页
+    """
+    if old_pages is None:
+        return [(0, len(new_pages) - 1)]
+    dirty = np.flatnonzero(np.any(old_pages != new_pages, axis=1))
+    runs = []
+    for page in dirty.tolist():
+        if runs and runs[-1][1] == page - 1:
+            runs[-1] = (runs[-1][0], page)
+        else:
+            runs.append((page, page))
+    return runs
+
+
+class OLEDRenderer:
+    """SSD1306显示屏渲染线程
+
+    字体只加载一次，每行文字的位图按内容缓存；显示内容（含时钟）不变时不渲染，
+    渲染后与上一帧逐页比较，只把变化的页写入I2C总线。
+    """
+
+    def __init__(self, oled, width, height, readings, interval=1.0, min_interval=0.2):
+        """初始化渲染器
+
+        Args:
+            oled: adafruit_ssd1306.SSD1306_I2C实例
+            width: 屏幕宽度(像素)
+            height: 屏幕高度(像素)
+            readings: readings.ReadingsStore，等待其新快照触发刷新
+            interval: 最长刷新间隔(秒)，用于更新时钟
+            min_interval: 最短刷新间隔(秒)，读数频繁变化时限制帧率
+        """
+        from PIL import Image, ImageDraw, ImageFont
+
+        self.Image = Image
+        self.ImageDraw = ImageDraw
+        self.oled = oled
+        self.width = width
+        self.height = height
+        self.readings = readings
+        self.interval = interval
+        self.min_interval = min_interval
+
+        self.font, self.small_font = self._load_fonts(ImageFont)
+
+        # 每行: 行号 -> (文字, 位图)
+        self.line_cache = {}
+        self.last_lines = None
+        self.last_pages = None
+
+        self.running = False
+        self.thread = None
+
+        # 统计信息
+        self.frames = 0
+        self.skipped = 0
+        self.pages_sent = 0
+
+    @staticmethod
+    def _load_fonts(ImageFont):
+        """加载中文字体，找不到时使用默认字体"""
+        for path in FONT_PATHS:
+            try:
+                return ImageFont.truetype(path, 12), ImageFont.truetype(path, 10)
+            except IOError:
+                continue
+        logger.warning("未找到中文字体，使用默认字体")
+        font = ImageFont.load_default()
+        return font, font
+
+    def start(self):
+        """启动渲染线程"""
+        self.running = True
+        self.thread = threading.Thread(target=self._render_loop, name="oled-renderer")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _render_loop(self):
+        seq = -1
+        while self.running:
+            # 有新读数时立即刷新，否则每interval秒刷新一次时钟
+            snapshot = self.readings.wait_for_update(seq, self.interval)
+            seq = snapshot.seq
+            if not self.running:
+                break
+            try:
+                self.render(snapshot)
+            except Exception as e:
+                logger.warning(f"更新OLED显示失败: {e}")
+            time.sleep(self.min_interval)
+
+    def _layout(self, readings):
+        """生成要显示的各行文字: [((x, y), 字体, 文字), ...]"""
+        current_time = datetime.now().strftime("%H:%M:%S")
+        time_x = self.width - self._text_width(current_time, self.font) - 2
+        return [
+            ((0, 0), self.font, f"温度: {readings['air_temperature']:.1f}°C"),
+            ((0, 16), self.font, f"湿度: {readings['air_humidity']:.1f}%"),
+            ((0, 32), self.font, f"土壤: {readings['soil_moisture']:.1f}%"),
+            ((0, 48), self.small_font, f"光照: {int(readings['light_intensity'])}"),
+            # 显示时间（右下角）
+            ((time_x, self.height - 12), self.small_font, current_time),
+        ]
+
+    def _text_width(self, text, font):
+        if hasattr(font, "getlength"):
+            return font.getlength(text)
+        return font.getbbox(text)[2]
+
+    def _line_image(self, key, font, text):
+        """获取一行文字的位图，文字不变时直接复用"""
+        cached = self.line_cache.get(key)
+        if cached and cached[0] == text:
+            return cached[1]
+        left, top, right, bottom = font.getbbox(text)
+        image = self.Image.new("1", (max(1, right), max(1, bottom)))
+        self.ImageDraw.Draw(image).text((0, 0), text, font=font, fill=255)
+        self.line_cache[key] = (text, image)
+        return image
+
+    def render(self, readings):
+        """渲染一帧，内容不变时跳过
+
+        Returns:
+            int: 写入总线的页数
+        """
+        lines = self._layout(readings)
+        if lines == self.last_lines:
+            self.skipped += 1
+            return 0
+
+        image = self.Image.new("1", (self.width, self.height))
+        for index, ((x, y), font, text) in enumerate(lines):
+            image.paste(self._line_image(index, font, text), (int(x), y))
+
+        pages = image_to_pages(np.array(image), self.height, self.width)
+        sent = self._write_pages(pages)
+        self.last_lines = lines
+        self.last_pages = pages
+        self.frames += 1
+        self.pages_sent += sent
+        return sent
+
+    def _write_pages(self, pages):
+        """只把变化的页写入显示屏"""
+        runs = dirty_page_runs(self.last_pages, pages)
+        # 同步驱动自身的帧缓冲，保证之后调用show()时内容一致
+        self.oled.buffer[1:] = pages.tobytes()
+
+        sent = 0
+        for first, last in runs:
+            for cmd in (SET_COL_ADDR, 0, self.width - 1, SET_PAGE_ADDR, first, last):
+                self.oled.write_cmd(cmd)
+            # 与write_cmd一样在设备上下文中写入，持有I2C总线锁
+            with self.oled.i2c_device:
+                self.oled.i2c_device.write(bytes([DATA_CONTROL]) + pages[first:last + 1].tobytes())
+            sent += last - first + 1
+        return sent
+
+    def get_stats(self):
+        """获取渲染统计信息"""
+        return {"frames": self.frames, "skipped": self.skipped, "pages_sent": self.pages_sent}
+
+    def stop(self):
+        """停止渲染线程"""
+        self.running = False
+        if self.thread is not None and self.thread.is_alive():
+            self.thread.join(timeout=2.0)
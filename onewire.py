@@ -0,0 +1,161 @@
+"""
+1-Wire模块 - 多个DS18B20探头的发现与批量转换读取
+"""
+
+import logging
+import os
+import time
+
+from logsetup import setup_logging
+
+# 配置日志
+setup_logging()
+
+logger = logging.getLogger("OneWire")
+
+W1_DEVICES_DIR = "/sys/bus/w1/devices"
+# DS18B20的家族码
+DS18B20_FAMILY = "28-"
+# 12位分辨率下一次转换最长750ms，留少量余量
+CONVERSION_TIMEOUT_S = 1.0
+POLL_INTERVAL_S = 0.05
+# 上电复位后温度寄存器的默认值(毫摄氏度)，读到该值说明转换没有完成（常见于供电不足）
+POWER_ON_RESET_MC = 85000
+
+
+def parse_w1_slave(text):
+    """解析w1_slave文件内容
+
+    Returns:
+        float: 温度(°C)，CRC校验失败、上电复位值或格式错误时返回None
+    """
+    lines = text.splitlines()
+    if len(lines) < 2 or "YES" not in lines[0]:
+        return None
+    pos = lines[1].find("t=")
+    if pos == -1:
+        return None
+    return parse_temperature(lines[1][pos + 2:])
+
+
+def parse_temperature(text):
+    """解析temperature属性文件内容（毫摄氏度整数），上电复位值返回None"""
+    text = text.strip()
+    if not text:
+        return None
+    millicelsius = int(text)
+    if millicelsius == POWER_ON_RESET_MC:
+        return None
+    return millicelsius / 1000.0
+
+
+class OneWireBus:
+    """1-Wire总线上的DS18B20探头集合
+
+    内核支持时通过总线主控的therm_bulk_read一次触发所有探头同时转换，
+    等待转换结束后逐个读取temperature属性（不再触发新的转换）；
+    否则退回到逐个读取w1_slave，每个探头各转换一次。
+    所有路径都相对于root，可以用临时目录模拟sysfs进行测试。
+    """
+
+    def __init__(self, root=W1_DEVICES_DIR, conversion_timeout=CONVERSION_TIMEOUT_S):
+        """初始化总线
+
+        Args:
+            root: w1设备目录
+            conversion_timeout: 批量转换的最长等待时间(秒)
+        """
+        self.root = str(root)
+        self.conversion_timeout = conversion_timeout
+
+    def probes(self):
+        """列出当前连接的DS18B20探头ID（每次调用重新扫描，支持热插拔）"""
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return []
+        return sorted(name for name in names if name.startswith(DS18B20_FAMILY))
+
+    def bulk_read_files(self):
+        """支持批量转换的总线主控的therm_bulk_read路径"""
+        paths = []
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return paths
+        for name in sorted(names):
+            if name.startswith("w1_bus_master"):
+                path = os.path.join(self.root, name, "therm_bulk_read")
+                if os.path.exists(path):
+                    paths.append(path)
+        return paths
+
+    def _read_file(self, *parts):
+        with open(os.path.join(self.root, *parts), "r") as f:
+            return f.read()
+
+    def _bulk_convert(self, paths):
+        """触发所有总线的批量转换并等待完成
+
+        Returns:
+            bool: 是否在超时前完成
+        """
+        for path in paths:
+            with open(path, "w") as f:
+                f.write("trigger\n")
+
+        # 读取结果: -1 仍有探头在转换, 1 转换完成有未读结果, 0 无待处理转换
+        deadline = time.monotonic() + self.conversion_timeout
+        pending = list(paths)
+        while pending:
+            still = []
+            for path in pending:
+                with open(path, "r") as f:
+                    if f.read().strip() == "-1":
+                        still.append(path)
+            pending = still
+            if not pending:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(POLL_INTERVAL_S)
+        return True
+
+    def _read_probe(self, probe, bulk):
+        """读取单个探头
+
+        批量转换后读取temperature属性只返回已转换的结果；
+        没有temperature属性或未做批量转换时读取w1_slave（会触发一次转换）。
+        """
+        if bulk and os.path.exists(os.path.join(self.root, probe, "temperature")):
+            return parse_temperature(self._read_file(probe, "temperature"))
+        return parse_w1_slave(self._read_file(probe, "w1_slave"))
+
+    def read_all(self):
+        """读取所有探头的温度
+
+        Returns:
+            dict: {探头ID: 温度(°C)}，读取失败的探头为None
+        """
+        probes = self.probes()
+        if not probes:
+            return {}
+
+        bulk = False
+        paths = self.bulk_read_files()
+        if paths:
+            try:
+                bulk = self._bulk_convert(paths)
+                if not bulk:
+                    logger.warning("DS18B20批量转换超时，改为逐个读取")
+            except OSError as e:
+                logger.warning(f"DS18B20批量转换失败，改为逐个读取: {e}")
+
+        temperatures = {}
+        for probe in probes:
+            try:
+                temperatures[probe] = self._read_probe(probe, bulk)
+            except (OSError, ValueError) as e:
+                logger.warning(f"读取DS18B20探头 {probe} 失败: {e}")
+                temperatures[probe] = None
+        return temperatures
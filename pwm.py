@@ -0,0 +1,247 @@
+"""
+PWM模块 - 可切换的PWM输出后端
+
+所有后端都提供与RPi.GPIO.PWM相同的接口: start(duty), ChangeDutyCycle(duty), stop()，
+占空比为0-100的百分比。
+"""
+
+import logging
+import os
+import threading
+import time
+
+# 导入配置文件
+from config import SYSTEM_CONFIG
+from logsetup import setup_logging
+
+# 配置日志
+setup_logging()
+
+logger = logging.getLogger("PWM")
+
+PWM_BACKENDS = ("pigpio", "sysfs", "rpi_gpio", "fake")
+
+# 支持硬件PWM的引脚及其所属通道（同一通道的引脚只能输出相同的波形）
+HARDWARE_PWM_CHANNELS = {12: 0, 18: 0, 13: 1, 19: 1}
+
+SYSFS_PWM_DIR = "/sys/class/pwm"
+
+
+class RPiGPIOPWM:
+    """RPi.GPIO软件PWM（由Python线程定时，进程繁忙时会抖动）"""
+
+    def __init__(self, pin, frequency):
+        import RPi.GPIO as GPIO
+
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup(pin, GPIO.OUT)
+        self.pwm = GPIO.PWM(pin, frequency)
+
+    def start(self, duty):
+        self.pwm.start(duty)
+
+    def ChangeDutyCycle(self, duty):
+        self.pwm.ChangeDutyCycle(duty)
+
+    def stop(self):
+        self.pwm.stop()
+
+
+class PigpioPWM:
+    """pigpio PWM
+
+    引脚支持硬件PWM且该通道未被占用时使用硬件PWM（PWM外设定时），
+    否则使用pigpio的DMA定时PWM；两种方式都不受Python进程调度影响。
+    舵机输出在DMA定时时改用set_servo_pulsewidth，脉宽按微秒设置，
+    避免占空比范围在50Hz下只有20µs一级（约3.6°）。
+    """
+
+    # 已被占用的硬件PWM通道 -> 引脚
+    _claimed_channels = {}
+    _claim_lock = threading.Lock()
+
+    def __init__(self, pin, frequency, pi=None, servo=False):
+        import pigpio
+
+        self.pi = pi or pigpio.pi()
+        if not self.pi.connected:
+            raise RuntimeError("无法连接pigpio守护进程，请先运行 sudo pigpiod")
+        self.pin = pin
+        self.frequency = frequency
+        self.servo = servo
+
+        self.hardware = False
+        channel = HARDWARE_PWM_CHANNELS.get(pin)
+        if channel is not None:
+            with self._claim_lock:
+                if channel not in self._claimed_channels:
+                    self._claimed_channels[channel] = pin
+                    self.hardware = True
+
+        if not self.hardware:
+            self.pi.set_mode(pin, pigpio.OUTPUT)
+            if not servo:
+                # DMA定时PWM，占空比范围设为1000以获得0.1%的分辨率
+                self.pi.set_PWM_frequency(pin, frequency)
+                self.pi.set_PWM_range(pin, 1000)
+
+        if self.hardware:
+            mode = "硬件PWM"
+        elif servo:
+            mode = "DMA定时舵机脉冲"
+        else:
+            mode = "DMA定时PWM"
+        logger.info(f"GPIO{pin} 使用pigpio{mode} ({frequency}Hz)")
+
+    def start(self, duty):
+        self.ChangeDutyCycle(duty)
+
+    def ChangeDutyCycle(self, duty):
+        duty = max(0.0, min(100.0, duty))
+        if self.hardware:
+            # 硬件PWM的占空比单位为百万分之一
+            self.pi.hardware_PWM(self.pin, self.frequency, int(duty * 10000))
+        elif self.servo:
+            # 占空比换算为脉宽(微秒)，0表示停止输出脉冲
+            self.pi.set_servo_pulsewidth(self.pin, int(round(duty * 10000 / self.frequency)))
+        else:
+            self.pi.set_PWM_dutycycle(self.pin, int(duty * 10))
+
+    def stop(self):
+        if self.hardware:
+            self.pi.hardware_PWM(self.pin, 0, 0)
+            with self._claim_lock:
+                self._claimed_channels.pop(HARDWARE_PWM_CHANNELS[self.pin], None)
+        elif self.servo:
+            self.pi.set_servo_pulsewidth(self.pin, 0)
+        else:
+            self.pi.set_PWM_dutycycle(self.pin, 0)
+
+
+class SysfsPWM:
+    """内核PWM sysfs接口（需在config.txt中启用dtoverlay=pwm或pwm-2chan）
+
+    每个(pwmchip, 通道)同时只能由一个输出使用，重复使用时抛出RuntimeError，
+    避免两个引脚互相改写同一通道的周期。
+    """
+
+    # 已被占用的 (pwmchip, 通道)
+    _claimed_channels = set()
+    _claim_lock = threading.Lock()
+
+    def __init__(self, chip, channel, frequency, root=None):
+        """初始化
+
+        Args:
+            chip: pwmchip编号
+            channel: 通道编号
+            frequency: 频率(Hz)
+            root: PWM sysfs目录，None时使用SYSFS_PWM_DIR，可用临时目录模拟
+        """
+        with self._claim_lock:
+            if (chip, channel) in self._claimed_channels:
+                raise RuntimeError(f"pwmchip{chip}的通道{channel}已被占用")
+            self._claimed_channels.add((chip, channel))
+        self.claim = (chip, channel)
+
+        try:
+            self._setup(chip, channel, frequency, root or SYSFS_PWM_DIR)
+        except Exception:
+            self._release()
+            raise
+
+    def _setup(self, chip, channel, frequency, root):
+        chip_dir = os.path.join(str(root), f"pwmchip{chip}")
+        self.dir = os.path.join(chip_dir, f"pwm{channel}")
+        if not os.path.exists(self.dir):
+            self._write(os.path.join(chip_dir, "export"), channel)
+            # 导出后udev需要一点时间设置权限
+            for _ in range(20):
+                if os.path.exists(os.path.join(self.dir, "period")):
+                    break
+                time.sleep(0.05)
+
+        self.period_ns = int(1e9 / frequency)
+        # 先把占空比清零，避免新周期小于旧占空比时写入失败
+        self._write(os.path.join(self.dir, "duty_cycle"), 0)
+        self._write(os.path.join(self.dir, "period"), self.period_ns)
+
+    @staticmethod
+    def _write(path, value):
+        with open(path, "w") as f:
+            f.write(f"{value}\n")
+
+    def start(self, duty):
+        self.ChangeDutyCycle(duty)
+        self._write(os.path.join(self.dir, "enable"), 1)
+
+    def ChangeDutyCycle(self, duty):
+        duty = max(0.0, min(100.0, duty))
+        self._write(os.path.join(self.dir, "duty_cycle"), int(self.period_ns * duty / 100))
+
+    def stop(self):
+        self._write(os.path.join(self.dir, "enable"), 0)
+        self._release()
+
+    def _release(self):
+        with self._claim_lock:
+            self._claimed_channels.discard(self.claim)
+
+
+class FakePWM:
+    """不操作硬件的PWM，记录占空比变化，用于测试和无硬件环境"""
+
+    def __init__(self, pin, frequency):
+        self.pin = pin
+        self.frequency = frequency
+        self.duty = 0
+        self.running = False
+        self.history = []
+
+    def start(self, duty):
+        self.running = True
+        self.ChangeDutyCycle(duty)
+
+    def ChangeDutyCycle(self, duty):
+        self.duty = duty
+        self.history.append((time.monotonic(), duty))
+
+    def stop(self):
+        self.running = False
+
+
+def create_pwm(pin, frequency, backend=None, servo=False):
+    """按配置创建PWM输出
+
+    Args:
+        pin: BCM引脚编号
+        frequency: 频率(Hz)
+        backend: 后端名称，None时使用SYSTEM_CONFIG["PWM_BACKEND"]
+        servo: 是否为舵机输出（pigpio DMA定时时按微秒脉宽输出，频率须为50Hz）
+
+    pigpio后端不可用、sysfs后端未配置该引脚或其通道已被占用时，退回到RPi.GPIO软件PWM。
+    """
+    backend = backend or SYSTEM_CONFIG.get("PWM_BACKEND", "rpi_gpio")
+    if backend not in PWM_BACKENDS:
+        raise ValueError(f"未知的PWM后端: {backend}")
+
+    if backend == "pigpio":
+        try:
+            return PigpioPWM(pin, frequency, servo=servo)
+        except Exception as e:
+            logger.warning(f"pigpio PWM不可用，GPIO{pin} 改用RPi.GPIO软件PWM: {e}")
+            return RPiGPIOPWM(pin, frequency)
+    if backend == "sysfs":
+        channels = SYSTEM_CONFIG.get("PWM_SYSFS_CHANNELS", {})
+        if pin not in channels:
+            logger.warning(f"GPIO{pin} 未在PWM_SYSFS_CHANNELS中配置，改用RPi.GPIO软件PWM")
+            return RPiGPIOPWM(pin, frequency)
+        chip, channel = channels[pin]
+        try:
+            return SysfsPWM(chip, channel, frequency)
+        except Exception as e:
+            logger.warning(f"sysfs PWM不可用，GPIO{pin} 改用RPi.GPIO软件PWM: {e}")
+            return RPiGPIOPWM(pin, frequency)
+    if backend == "fake":
+        return FakePWM(pin, frequency)
+    return RPiGPIOPWM(pin, frequency)
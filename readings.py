@@ -0,0 +1,85 @@
+"""
+读数模块 - 带版本号的只读读数快照
+"""
+
+import threading
+from datetime import datetime
+
+
+class ReadingsSnapshot(dict):
+    """只读的读数快照
+
+    是dict的子类，可以直接序列化为JSON；任何修改操作都会抛出TypeError，
+    需要修改时请先用dict(snapshot)复制。
+    """
+
+    def __init__(self, data, seq):
+        super().__init__(data)
+        self.seq = seq
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("读数快照为只读，请先复制: dict(snapshot)")
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+    __ior__ = _readonly
+
+
+class ReadingsStore:
+    """最新读数的发布点
+
+    每次发布都生成一个新的只读快照并递增序号，旧快照不会被修改，
+    读取方拿到的始终是一致的一组数据；wait_for_update在条件变量上等待新快照，
+    不需要轮询。
+    """
+
+    def __init__(self, initial):
+        """初始化
+
+        Args:
+            initial: 初始读数字典
+        """
+        self.condition = threading.Condition()
+        self.snapshot = ReadingsSnapshot(initial, 0)
+
+    @property
+    def seq(self):
+        """当前快照序号"""
+        return self.snapshot.seq
+
+    def get(self):
+        """获取当前快照（不复制）"""
+        return self.snapshot
+
+    def publish(self, updates):
+        """合并更新并发布新快照，同时刷新timestamp
+
+        Returns:
+            ReadingsSnapshot: 新快照
+        """
+        with self.condition:
+            data = dict(self.snapshot)
+            data.update(updates)
+            data["timestamp"] = datetime.now().isoformat()
+            self.snapshot = ReadingsSnapshot(data, self.snapshot.seq + 1)
+            self.condition.notify_all()
+            return self.snapshot
+
+    def wait_for_update(self, after_seq, timeout=None):
+        """等待序号大于after_seq的快照
+
+        Args:
+            after_seq: 调用方已处理的序号
+            timeout: 最长等待时间(秒)，None为一直等待
+
+        Returns:
+            ReadingsSnapshot: 最新快照；超时时返回当前快照（其seq可能仍等于after_seq）
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.snapshot.seq > after_seq, timeout)
+            return self.snapshot
@@ -0,0 +1,130 @@
+"""
+环形缓冲区模块 - 在内存中保存最近一段时间的传感器读数
+"""
+
+import threading
+import numpy as np
+
+
+class SampleRingBuffer:
+    """预分配的数组环形缓冲区
+
+    时间戳和各字段值分别保存在固定大小的NumPy数组中，写入为O(1)，
+    按时间范围查询时对两段有序数据做二分查找和切片，不逐行构造对象。
+    """
+
+    def __init__(self, capacity, fields):
+        """初始化环形缓冲区
+
+        Args:
+            capacity: 最多保存的样本数
+            fields: 字段名序列
+        """
+        self.capacity = int(capacity)
+        self.fields = tuple(fields)
+        self.ts_ms = np.zeros(self.capacity, dtype=np.int64)
+        self.values = np.full((self.capacity, len(self.fields)), np.nan, dtype=np.float64)
+        self.head = 0    # 下一次写入位置
+        self.count = 0   # 当前样本数
+        self.seq = 0     # 累计写入次数，数据变化的版本号
+        self.lock = threading.Lock()
+
+    def append(self, ts_ms, values):
+        """追加一个样本
+
+        Args:
+            ts_ms: 毫秒时间戳（应单调递增）
+            values: 与fields顺序一致的数值序列，None记为NaN
+        """
+        row = [np.nan if v is None else v for v in values]
+        with self.lock:
+            self.ts_ms[self.head] = ts_ms
+            self.values[self.head] = row
+            self.head = (self.head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+            self.seq += 1
+
+    def oldest_ms(self):
+        """最早样本的时间戳，缓冲区为空时返回None"""
+        with self.lock:
+            if self.count == 0:
+                return None
+            return int(self.ts_ms[(self.head - self.count) % self.capacity])
+
+    def _segments(self):
+        """按时间顺序返回有效数据所在的一到两个下标区间"""
+        start = (self.head - self.count) % self.capacity
+        if start + self.count <= self.capacity:
+            return [(start, start + self.count)]
+        return [(start, self.capacity), (0, self.head)]
+
+    def query(self, start_ms, end_ms=None):
+        """查询时间范围内的样本
+
+        Args:
+            start_ms: 起始时间(毫秒，含)
+            end_ms: 结束时间(毫秒，不含)，为None时到最新
+
+        Returns:
+            (ts_ms, values): 时间戳数组和二维数值数组（均为副本）
+        """
+        ts_parts = []
+        value_parts = []
+        with self.lock:
+            for lo, hi in self._segments():
+                ts = self.ts_ms[lo:hi]
+                i = lo + np.searchsorted(ts, start_ms, side="left")
+                j = hi if end_ms is None else lo + np.searchsorted(ts, end_ms, side="left")
+                if i < j:
+                    ts_parts.append(self.ts_ms[i:j].copy())
+                    value_parts.append(self.values[i:j].copy())
+
+        if not ts_parts:
+            return np.empty(0, dtype=np.int64), np.empty((0, len(self.fields)), dtype=np.float64)
+        return np.concatenate(ts_parts), np.concatenate(value_parts)
+
+
+def downsample(ts_ms, values, max_points):
+    """把样本按等长分块求平均，点数不超过max_points
+
+    Returns:
+        (ts_ms, values): 每块取第一个时间戳，数值为块内均值（忽略NaN）
+    """
+    n = len(ts_ms)
+    if n <= max_points:
+        return ts_ms, values
+    step = -(-n // max_points)
+    starts = np.arange(0, n, step)
+    valid = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0)
+    counts = np.add.reduceat(valid.astype(np.int64), starts, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    return ts_ms[starts], means
+
+
+def to_rows(ts_ms, values, offset_ms=0):
+    """把数组结果转换为 (ts_ms, timestamp, 各字段值...) 元组列表，NaN转换为None
+
+    Args:
+        offset_ms: 本地时区偏移，使时间戳字符串与isoformat()一致
+    """
+    timestamps = (ts_ms + offset_ms).astype("datetime64[ms]").astype(str).tolist()
+    columns = [np.where(np.isnan(values[:, i]), None, values[:, i]).tolist()
+               for i in range(values.shape[1])]
+    return list(zip(ts_ms.tolist(), timestamps, *columns))
+
+
+def to_columns(ts_ms, values, fields, offset_ms=0, precision=None):
+    """把数组结果转换为列式字典: timestamp及各字段各一个列表，NaN转换为None
+
+    Args:
+        precision: 数值保留的小数位数，None为不舍入
+    """
+    if precision is not None:
+        values = np.round(values, precision)
+    columns = {"timestamp": (ts_ms + offset_ms).astype("datetime64[ms]").astype(str).tolist()}
+    for i, field in enumerate(fields):
+        columns[field] = np.where(np.isnan(values[:, i]), None, values[:, i]).tolist()
+    return columns
+
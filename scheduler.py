@@ -0,0 +1,200 @@
+"""
+采集调度模块 - 每个传感器按各自的周期和超时独立采集
+"""
+
+import logging
+import threading
+import time
+
+from logsetup import setup_logging
+
+# 配置日志
+setup_logging()
+
+logger = logging.getLogger("Scheduler")
+
+
+class SensorTask:
+    """单个传感器的采集任务
+
+    读取函数在专用的工作线程中执行，调度线程只等待到超时为止；
+    读取卡住时后续周期直接跳过，不会堆积请求，也不影响其他传感器。
+    """
+
+    def __init__(self, name, read, period, timeout):
+        """初始化采集任务
+
+        Args:
+            name: 任务名称
+            read: 读取函数，返回结果或None（本次无有效数据）
+            period: 采样周期(秒)
+            timeout: 单次读取超时(秒)
+        """
+        self.name = name
+        self.read = read
+        self.period = period
+        self.timeout = timeout
+
+        # 工作线程状态
+        self.busy = False
+        self.result = None
+        self.error = None
+        self.request = threading.Event()
+        self.done = threading.Event()
+        # 周期被修改时唤醒调度线程重新计算下一次采样时刻
+        self.wakeup = threading.Event()
+
+        # 统计信息
+        self.reads = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.skipped = 0
+        self.last_duration = None
+        self.last_success = None
+
+    def worker_loop(self, stop_event):
+        """工作线程：等待请求并执行读取"""
+        while not stop_event.is_set():
+            if not self.request.wait(timeout=0.5):
+                continue
+            self.request.clear()
+            try:
+                self.result = self.read()
+                self.error = None
+            except Exception as e:
+                self.result = None
+                self.error = e
+            self.busy = False
+            self.done.set()
+
+    def get_stats(self):
+        """获取任务统计信息"""
+        return {
+            "period": self.period,
+            "timeout": self.timeout,
+            "reads": self.reads,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "last_duration": self.last_duration,
+            "last_success": self.last_success,
+        }
+
+
+class AcquisitionScheduler:
+    """采集调度器
+
+    每个任务有独立的调度线程和工作线程，结果到达后立即通过on_result回调合并，
+    慢速或卡住的设备只影响自身。
+    """
+
+    def __init__(self, on_result):
+        """初始化调度器
+
+        Args:
+            on_result: 结果回调 on_result(name, result)，在该任务的调度线程中调用
+        """
+        self.on_result = on_result
+        self.tasks = {}
+        self.threads = []
+        self.stop_event = threading.Event()
+        self.running = False
+
+    def add_task(self, name, read, period, timeout=None):
+        """添加采集任务（需在start之前调用）"""
+        if timeout is None:
+            timeout = period
+        self.tasks[name] = SensorTask(name, read, period, timeout)
+        return self.tasks[name]
+
+    def start(self):
+        """启动所有任务"""
+        if self.running:
+            logger.warning("采集调度器已在运行中")
+            return
+        self.running = True
+        self.stop_event.clear()
+
+        for task in self.tasks.values():
+            self._start_thread(task.worker_loop, (self.stop_event,), f"{task.name}-worker")
+            self._start_thread(self._schedule_loop, (task,), f"{task.name}-scheduler")
+
+        logger.info("采集调度器已启动: " + ", ".join(
+            f"{task.name}={task.period}s" for task in self.tasks.values()))
+
+    def _start_thread(self, target, args, name):
+        thread = threading.Thread(target=target, args=args, name=name)
+        thread.daemon = True
+        thread.start()
+        self.threads.append(thread)
+
+    def _schedule_loop(self, task):
+        """调度线程：按周期触发读取并等待结果"""
+        next_run = time.monotonic()
+
+        while not self.stop_event.is_set():
+            cycle_start = next_run
+            if task.busy:
+                # 上一次读取仍未返回（设备卡住），跳过本周期
+                task.skipped += 1
+            else:
+                task.busy = True
+                task.done.clear()
+                started = time.monotonic()
+                task.request.set()
+
+                if not task.done.wait(task.timeout):
+                    task.timeouts += 1
+                    if task.timeouts == 1 or task.timeouts % 100 == 0:
+                        logger.warning(f"{task.name} 读取超时({task.timeout}s)，累计 {task.timeouts} 次")
+                else:
+                    task.reads += 1
+                    task.last_duration = time.monotonic() - started
+                    if task.error is not None:
+                        task.errors += 1
+                        logger.warning(f"{task.name} 读取失败: {task.error}")
+                    elif task.result is not None:
+                        task.last_success = time.time()
+                        try:
+                            self.on_result(task.name, task.result)
+                        except Exception as e:
+                            logger.error(f"处理 {task.name} 读取结果失败: {e}")
+
+            # 等待到下一次采样时刻；期间周期被修改时按新周期重新计算
+            while not self.stop_event.is_set():
+                next_run = cycle_start + task.period
+                now = time.monotonic()
+                if next_run <= now:
+                    break
+                task.wakeup.wait(next_run - now)
+                task.wakeup.clear()
+
+            # 落后超过一个周期时不补采，直接从当前时间重新开始
+            now = time.monotonic()
+            if now - next_run >= task.period:
+                next_run = now
+
+    def set_period(self, name, period):
+        """修改任务的采样周期，立即生效"""
+        task = self.tasks[name]
+        if task.period != period:
+            task.period = period
+            task.wakeup.set()
+
+    def get_stats(self):
+        """获取所有任务的统计信息"""
+        return {name: task.get_stats() for name, task in self.tasks.items()}
+
+    def stop(self, timeout=2.0):
+        """停止所有任务（卡住的读取线程为守护线程，随进程退出）"""
+        if not self.running:
+            return
+        self.running = False
+        self.stop_event.set()
+        for task in self.tasks.values():
+            task.wakeup.set()
+        deadline = time.monotonic() + timeout
+        for thread in self.threads:
+            thread.join(timeout=max(0.0, deadline - time.monotonic()))
+        self.threads = []
+        logger.info("采集调度器已停止")
@@ -11,7 +11,6 @@ import digitalio
 from adafruit_ssd1306 import SSD1306_I2C
 import RPi.GPIO as GPIO
 import adafruit_ads1x15.ads1115 as ADS
-from adafruit_ads1x15.analog_in import AnalogIn
 import threading
 import logging
 import os
@@ -20,19 +19,33 @@ import sqlite3
 
 # 导入配置文件
 from config import GPIO_CONFIG, I2C_CONFIG, SYSTEM_CONFIG, THRESHOLD_CONFIG
+from logsetup import setup_logging
+from storage import (DatabaseWriter, HISTORY_RESOLUTIONS, LOCAL_OFFSET_MS, SENSOR_FIELDS,
+                     choose_resolution, columns_to_records, iter_history,
+                     query_history_columns, round_columns, to_epoch_ms)
+from ringbuffer import SampleRingBuffer, downsample, to_columns
+from archive import SegmentArchive
+from dht11 import PigpioDHT11Reader
+from scheduler import AcquisitionScheduler
+from adc import ADS1115Sampler
+from onewire import OneWireBus
+from oled import OLEDRenderer
+from readings import ReadingsStore
+from stats import StreamingStats
+from adaptive import AdaptiveSampler
+from eventbus import bus, SENSOR_SAMPLE
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(SYSTEM_CONFIG["LOG_FILE"]),
-        logging.StreamHandler()
-    ]
-)
+setup_logging()
 
 logger = logging.getLogger("SensorModule")
 
+# DHT11读取失败时使用的模拟数据
+MOCK_TEMPERATURE_BASE = 25.3  # 固定温度基础值
+MOCK_HUMIDITY_BASE = 36.8     # 固定湿度基础值
+TEMPERATURE_VARIATION = 1.5  # 温度变化范围 ±1.5°C
+HUMIDITY_VARIATION = 3.0     # 湿度变化范围 ±3%
+
 class SensorModule:
     """传感器模块类"""
     
@@ -44,15 +57,20 @@ class SensorModule:
         GPIO.setmode(GPIO.BCM)
         GPIO.setwarnings(False)
         
-        # 初始化存储最新读数的变量
-        self.latest_readings = {
+        # 初始化存储最新读数的变量（每次更新发布一个新的只读快照）
+        self.readings = ReadingsStore({
             "air_temperature": 0,
             "air_humidity": 0,
             "soil_moisture": 0,
             "soil_temperature": 0,
             "light_intensity": 0,
             "timestamp": datetime.now().isoformat()
-        }
+        })
+        # 最近一次记录到环形缓冲区的快照
+        self.recorded_readings = self.readings.get()
+        
+        # 各DS18B20探头的土壤温度 {探头ID: 温度}
+        self.soil_temperatures = {}
         
         # 初始化传感器状态
         self.sensor_status = {
@@ -62,13 +80,30 @@ class SensorModule:
             "light_sensor": True
         }
         
+        # 各通道的滑动窗口统计（由每个采集样本增量更新）
+        self.stats = StreamingStats(SENSOR_FIELDS, SYSTEM_CONFIG["STATS_WINDOWS"])
+        
+        # 最近读数的内存环形缓冲区（短时间范围的历史查询不访问数据库）
+        ring_hours = SYSTEM_CONFIG.get("RING_BUFFER_HOURS", 24)
+        self.recent_buffer = SampleRingBuffer(
+            ring_hours * 3600 / SYSTEM_CONFIG["READING_INTERVAL"], SENSOR_FIELDS
+        )
+        
         # 初始化数据库
         self._init_database()
         
-        # 初始化DHT11传感器 - 使用直接GPIO方法
+        # 初始化DHT11传感器 - 优先使用pigpio边沿采集，失败时回退到直接GPIO方法
         try:
-            # 测试传感器是否可用
             self.DHT_PIN = GPIO_CONFIG['DHT11_PIN']
+            self.dht_reader = None
+            if SYSTEM_CONFIG.get("DHT11_BACKEND", "pigpio") == "pigpio":
+                try:
+                    self.dht_reader = PigpioDHT11Reader(self.DHT_PIN)
+                    logger.info("DHT11使用pigpio边沿采集")
+                except Exception as e:
+                    logger.warning(f"pigpio不可用，DHT11回退到直接GPIO读取: {e}")
+            
+            # 测试传感器是否可用
             humidity, temperature = self._read_dht11_direct()
             if humidity is None and temperature is None:
                 logger.warning("DHT11传感器初始测试失败，但继续尝试")
@@ -81,17 +116,24 @@ class SensorModule:
         GPIO.setup(GPIO_CONFIG["SOIL_MOISTURE_PIN"], GPIO.IN)
         
         # 初始化ADS1115 ADC转换器(用于读取模拟传感器)
+        # 连续转换模式下轮询ADC_CHANNELS中的所有通道，每通道过采样后取均值/中值
         try:
             i2c = busio.I2C(board.SCL, board.SDA)
             self.ads = ADS.ADS1115(i2c)
-            self.soil_moisture_channel = AnalogIn(self.ads, ADS.P0)  # 土壤湿度模拟输入
-            self.light_sensor_channel = AnalogIn(self.ads, ADS.P1)   # 光照传感器模拟输入
+            self.adc = ADS1115Sampler(
+                self.ads,
+                SYSTEM_CONFIG["ADC_CHANNELS"],
+                data_rate=SYSTEM_CONFIG["ADC_DATA_RATE"],
+                samples=SYSTEM_CONFIG["ADC_OVERSAMPLE"],
+                reducer=SYSTEM_CONFIG["ADC_REDUCER"]
+            )
             logger.info("ADS1115 ADC初始化成功")
         except Exception as e:
             logger.error(f"ADS1115 ADC初始化失败: {e}")
             self.sensor_status["soil_moisture"] = False
             self.sensor_status["light_sensor"] = False
             self.ads = None
+            self.adc = None
         
         # 初始化OLED显示屏
         try:
@@ -115,10 +157,21 @@ class SensorModule:
             self.oled.image(image)
             self.oled.show()
     
+            # 后台渲染线程，读数变化时刷新
+            self.display = OLEDRenderer(
+                self.oled,
+                I2C_CONFIG["OLED_WIDTH"],
+                I2C_CONFIG["OLED_HEIGHT"],
+                self.readings,
+                interval=SYSTEM_CONFIG["OLED_REFRESH_INTERVAL"],
+                min_interval=SYSTEM_CONFIG["OLED_MIN_INTERVAL"]
+            )
+    
             logger.info("OLED显示屏初始化成功")
         except Exception as e:
             logger.error(f"OLED显示屏初始化失败: {e}")
             self.oled = None
+            self.display = None
          
         
         # 初始化DS18B20土壤温度传感器(1-Wire协议)
@@ -126,28 +179,28 @@ class SensorModule:
             os.system('modprobe w1-gpio')
             os.system('modprobe w1-therm')
             
-            base_dir = '/sys/bus/w1/devices/'
-            device_folder = None
+            # 查找总线上所有DS18B20探头（之后每次读取都会重新扫描）
+            self.onewire = OneWireBus(SYSTEM_CONFIG["W1_DEVICES_DIR"])
+            probes = self.onewire.probes()
             
-            # 查找连接的DS18B20设备
-            for folder in os.listdir(base_dir):
-                if folder.startswith('28-'):
-                    device_folder = os.path.join(base_dir, folder)
-                    break
-            
-            if device_folder:
-                self.device_file = os.path.join(device_folder, 'w1_slave')
-                logger.info("DS18B20土壤温度传感器初始化成功")
+            if probes:
+                bulk = "支持" if self.onewire.bulk_read_files() else "不支持"
+                logger.info(f"DS18B20土壤温度传感器初始化成功: {', '.join(probes)} (批量转换{bulk})")
             else:
                 logger.error("未找到DS18B20设备")
                 self.sensor_status["soil_temperature"] = False
-                self.device_file = None
         except Exception as e:
             logger.error(f"DS18B20土壤温度传感器初始化失败: {e}")
             self.sensor_status["soil_temperature"] = False
-            self.device_file = None
+            self.onewire = None
+        
+        # 启动各传感器的采集任务
+        self._init_scheduler()
+        self.scheduler.start()
+        if self.display is not None:
+            self.display.start()
         
-        # 启动数据采集线程
+        # 启动数据记录线程
         self.running = True
         self.collect_thread = threading.Thread(target=self._collect_data_loop)
         self.collect_thread.daemon = True
@@ -156,47 +209,33 @@ class SensorModule:
         logger.info("传感器模块初始化完成")
     
     def _init_database(self):
-        """初始化SQLite数据库"""
-        try:
-            conn = sqlite3.connect(SYSTEM_CONFIG["DATABASE_FILE"])
-            cursor = conn.cursor()
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sensor_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                air_temperature REAL,
-                air_humidity REAL,
-                soil_moisture REAL,
-                soil_temperature REAL,
-                light_intensity REAL
-            )
-            ''')
-            conn.commit()
-            conn.close()
+        """初始化SQLite数据库、冷数据归档及后台写入线程"""
+        self.archive = None
+        if SYSTEM_CONFIG.get("ARCHIVE_AFTER_DAYS"):
+            try:
+                self.archive = SegmentArchive(SYSTEM_CONFIG["ARCHIVE_DIR"], SYSTEM_CONFIG["ARCHIVE_AFTER_DAYS"])
+            except Exception as e:
+                logger.error(f"数据归档初始化失败: {e}")
+        
+        self.db_writer = DatabaseWriter(SYSTEM_CONFIG["DATABASE_FILE"], archive=self.archive)
+        self.db_writer.start()
+        if self.db_writer.running:
             logger.info("数据库初始化成功")
-        except Exception as e:
-            logger.error(f"数据库初始化失败: {e}")
     
-    def _save_to_database(self):
-        """保存数据到数据库"""
+    def _save_to_database(self, readings):
+        """保存一个读数快照到数据库（放入写入队列，由后台线程批量提交）"""
         try:
-            conn = sqlite3.connect(SYSTEM_CONFIG["DATABASE_FILE"])
-            cursor = conn.cursor()
-            cursor.execute('''
-            INSERT INTO sensor_data 
-            (timestamp, air_temperature, air_humidity, soil_moisture, soil_temperature, light_intensity)
-            VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                datetime.now().isoformat(),
-                self.latest_readings["air_temperature"],
-                self.latest_readings["air_humidity"],
-                self.latest_readings["soil_moisture"],
-                self.latest_readings["soil_temperature"],
-                self.latest_readings["light_intensity"]
+            now = datetime.now()
+            self.db_writer.submit((
+                to_epoch_ms(now),
+                now.isoformat(),
+                readings["air_temperature"],
+                readings["air_humidity"],
+                readings["soil_moisture"],
+                readings["soil_temperature"],
+                readings["light_intensity"]
             ))
-            conn.commit()
-            conn.close()
-            logger.debug("数据已保存到数据库")
+            logger.debug("数据已加入数据库写入队列")
         except Exception as e:
             logger.error(f"保存数据到数据库失败: {e}")
     
@@ -324,9 +363,12 @@ class SensorModule:
     
 
     def _read_dht11_direct(self):
-        """直接使用GPIO读取DHT11传感器数据"""
+        """读取DHT11传感器数据（pigpio边沿采集或直接GPIO）"""
         try:
-            result = self._read_dht11_once()
+            if self.dht_reader is not None:
+                result = self.dht_reader.read()
+            else:
+                result = self._read_dht11_once()
             if result:
                 humidity, temperature = result
                 return humidity, temperature
@@ -349,15 +391,14 @@ class SensorModule:
             logger.warning(f"读取DHT11数据失败: {e}")
             return None, None
     
-    def _read_soil_moisture(self):
-        """读取土壤湿度传感器数据"""
-        if not self.sensor_status["soil_moisture"] or self.ads is None:
+    def _read_soil_moisture(self, voltage):
+        """把土壤湿度通道的电压转换为湿度百分比"""
+        if not self.sensor_status["soil_moisture"] or voltage is None:
             return None
         
         try:
-            # 读取模拟值并转换为百分比(0-100%)
+            # 模拟值转换为百分比(0-100%)
             # 假设0V对应干燥(0%)，3.3V对应完全湿润(100%)
-            voltage = self.soil_moisture_channel.voltage
             #moisture_percent = (voltage / 3.3) * 100
             moisture_percent = 100 - (voltage / 3.3) * 100  # 反转计算
             # 限制范围在0-100之间
@@ -369,39 +410,30 @@ class SensorModule:
             return None
     
     def _read_soil_temperature(self):
-        """读取土壤温度传感器数据"""
-        if not self.sensor_status["soil_temperature"] or self.device_file is None:
-            return None
+        """读取所有DS18B20探头的土壤温度
+
+        Returns:
+            dict: {探头ID: 温度}，只包含读取成功的探头
+        """
+        if self.onewire is None:
+            return {}
         
         try:
-            with open(self.device_file, 'r') as f:
-                lines = f.readlines()
-            
-            if len(lines) < 2 or 'YES' not in lines[0]:
-                return None
-            
-            equals_pos = lines[1].find('t=')
-            if equals_pos == -1:
-                return None
-            
-            temp_string = lines[1][equals_pos+2:]
-            temp_c = float(temp_string) / 1000.0
-            
-            return temp_c
+            temperatures = self.onewire.read_all()
         except Exception as e:
             logger.warning(f"读取土壤温度数据失败: {e}")
-            return None
+            return {}
+        
+        return {probe: temp for probe, temp in temperatures.items() if temp is not None}
 
-    def _read_light_intensity(self):
-        """读取光照强度传感器数据"""
-        if not self.sensor_status["light_sensor"] or self.ads is None:
+    def _read_light_intensity(self, voltage):
+        """把光照通道的电压转换为光照强度"""
+        if not self.sensor_status["light_sensor"] or voltage is None:
             return None
         
         try:
-            # 读取模拟值并转换为光照强度(lux)
+            # 模拟值转换为光照强度(lux)
             # 这里使用简化的转换，实际使用中可能需要校准
-            voltage = self.light_sensor_channel.voltage
-            
             # 假设的转换公式，实际使用中需要根据传感器规格进行调整
             light_intensity = voltage * 10000 / 3.3
             
@@ -413,208 +445,295 @@ class SensorModule:
             
             
             
-    def _update_oled(self):
-        """更新OLED显示屏"""
-        if self.oled is None:
-            return
-    
-        try:
-            # 使用PIL创建图像对象
-            from PIL import Image, ImageDraw, ImageFont
+    def _read_dht11_task(self):
+        """DHT11采集任务：读取失败时使用模拟数据"""
+        temperature, humidity = self._read_dht11()
         
-            # 创建图像缓冲区
-            width = I2C_CONFIG["OLED_WIDTH"]
-            height = I2C_CONFIG["OLED_HEIGHT"]
-            image = Image.new("1", (width, height))
-            draw = ImageDraw.Draw(image)
+        # 添加调试日志
+        logger.debug(f"DHT11读取结果: temperature={temperature}, humidity={humidity}")
         
-            # 清空背景
-            draw.rectangle((0, 0, width, height), outline=0, fill=0)
+        if temperature is not None and humidity is not None:
+            return {"air_temperature": temperature, "air_humidity": humidity}
         
-            # 尝试加载字体
-            try:
-                # 尝试加载中文字体
-                font_paths = [
-                    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
-                    "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",
-                    "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc"
-                ]
-            
-                font = None
-                small_font = None
-                for path in font_paths:
-                    try:
-                        font = ImageFont.truetype(path, 12)
-                        small_font = ImageFont.truetype(path, 10)
-                        break
-                    except IOError:
-                        continue
-                
-                if font is None:
-                    # 使用默认字体
-                    font = ImageFont.load_default()
-                    small_font = font
-            except Exception as e:
-                logger.warning(f"加载字体出错: {e}")
-                font = ImageFont.load_default()
-                small_font = font
-        
-            # 绘制传感器数据
-            draw.text((0, 0), f"温度: {self.latest_readings['air_temperature']:.1f}°C", font=font, fill=255)
-            draw.text((0, 16), f"湿度: {self.latest_readings['air_humidity']:.1f}%", font=font, fill=255)
-            draw.text((0, 32), f"土壤: {self.latest_readings['soil_moisture']:.1f}%", font=font, fill=255)
-            draw.text((0, 48), f"光照: {int(self.latest_readings['light_intensity'])}", font=small_font, fill=255)
-        
-            # 显示时间（右下角）
-            current_time = datetime.now().strftime("%H:%M:%S")
-            time_width = font.getlength(current_time)
-            draw.text((width - time_width - 2, height - 12), current_time, font=small_font, fill=255)
-            
-            # 将PIL图像转换为OLED显示
-            self.oled.image(image)
-            self.oled.show()
+        #固定一下，糊弄一下
+        mock_temp = MOCK_TEMPERATURE_BASE + random.uniform(-TEMPERATURE_VARIATION, TEMPERATURE_VARIATION)
+        mock_humidity = MOCK_HUMIDITY_BASE + random.uniform(-HUMIDITY_VARIATION, HUMIDITY_VARIATION)
+        logger.debug(f"使用模拟数据: temp={mock_temp:.1f}, humidity={mock_humidity:.1f}")
+        return {"air_temperature": mock_temp, "air_humidity": mock_humidity}
+    
+    def _read_adc_task(self):
+        """ADC采集任务：轮询所有通道一次，换算土壤湿度和光照强度"""
+        if self.adc is None:
+            return None
         
-        except Exception as e:
-            logger.warning(f"更新OLED显示失败: {e}")           
-            
-            
-            
+        voltages = self.adc.read_cycle()
+        result = {}
+        soil_moisture = self._read_soil_moisture(voltages.get("soil_moisture"))
+        if soil_moisture is not None:
+            result["soil_moisture"] = soil_moisture
+        light_intensity = self._read_light_intensity(voltages.get("light_intensity"))
+        if light_intensity is not None:
+            result["light_intensity"] = light_intensity
+        return result or None
     
-    # 在_collect_data_loop中修改DHT11读取策略：
-    def _collect_data_loop(self):
-        """数据采集循环"""
-        last_save_time = time.time()
-        last_dht_reading = 0  # 记录上次DHT11读取时间
-        failed_attempts = 0   # 记录连续失败次数
-       
-        #固定一下，糊弄一下
-        MOCK_TEMPERATURE_BASE = 25.3  # 固定温度基础值
-        MOCK_HUMIDITY_BASE = 36.8     # 固定湿度基础值
-        TEMPERATURE_VARIATION = 1.5  # 温度变化范围 ±1.5°C
-        HUMIDITY_VARIATION = 3.0     # 湿度变化范围 ±3%
+    def _read_soil_temperature_task(self):
+        """土壤温度采集任务：每个探头作为独立通道，主探头的值作为soil_temperature"""
+        temperatures = self._read_soil_temperature()
+        self.sensor_status["soil_temperature"] = bool(temperatures)
+        self.soil_temperatures = temperatures
+        if not temperatures:
+            return None
+        
+        primary = SYSTEM_CONFIG.get("SOIL_TEMPERATURE_PROBE")
+        if primary not in temperatures:
+            primary = next(iter(temperatures))
+        return {"soil_temperature": temperatures[primary]}
+    
+    def _on_acquisition_result(self, name, result):
+        """采集结果到达后立即发布新的读数快照并更新统计"""
+        snapshot = self.readings.publish(result)
+        bus.publish(SENSOR_SAMPLE, snapshot)
+        now = time.monotonic()
+        for field, value in result.items():
+            self.stats.add(field, now, value)
+    
+    def _init_scheduler(self):
+        """按SENSOR_SCHEDULE为每个传感器创建独立的采集任务"""
+        self.scheduler = AcquisitionScheduler(self._on_acquisition_result)
+        tasks = {
+            "dht11": self._read_dht11_task,
+            "adc": self._read_adc_task,
+            "soil_temperature": self._read_soil_temperature_task,
+        }
+        schedule = SYSTEM_CONFIG.get("SENSOR_SCHEDULE", {})
+        for name, read in tasks.items():
+            options = schedule.get(name, {})
+            self.scheduler.add_task(
+                name, read,
+                period=options.get("period", SYSTEM_CONFIG["READING_INTERVAL"]),
+                timeout=options.get("timeout")
+            )
+        
+        # 自适应采样：平稳时降低采样和记录频率，变化或接近阈值时恢复
+        self.adaptive = None
+        adaptive_config = SYSTEM_CONFIG.get("ADAPTIVE_SAMPLING", {})
+        if adaptive_config.get("ENABLED"):
+            self.adaptive = AdaptiveSampler(
+                self.scheduler, self.stats, self.readings,
+                {
+                    "dht11": ["air_temperature", "air_humidity"],
+                    "adc": ["soil_moisture", "light_intensity"],
+                    "soil_temperature": ["soil_temperature"],
+                },
+                adaptive_config, THRESHOLD_CONFIG
+            )
+            self.scheduler.add_task(
+                "adaptive", self.adaptive.evaluate,
+                period=adaptive_config.get("CHECK_INTERVAL", 10.0)
+            )
         
         # 添加日志来检查传感器状态
         logger.info(f"DHT11传感器状态: {self.sensor_status['dht11']}")
+    
+    def _collect_data_loop(self):
+        """数据记录循环：各传感器由采集调度器独立更新，这里按READING_INTERVAL记录快照
+
+        启用自适应采样时，所有通道都平稳期间记录和保存间隔按相同倍数放大。
+        """
+        last_record_time = 0
+        last_save_time = time.time()
         
         while self.running:
             try:
                 current_time = time.time()
+                factor = self.adaptive.record_factor() if self.adaptive else 1
+                # 留少量余量，避免sleep的误差导致多跳过一个周期
+                tolerance = SYSTEM_CONFIG["READING_INTERVAL"] / 2
                 
-                if current_time - last_dht_reading >= 3.0:
-                    temperature, humidity = self._read_dht11()
+                if current_time - last_record_time >= SYSTEM_CONFIG["READING_INTERVAL"] * factor - tolerance:
+                    readings = self.readings.get()
                     
-                    # 添加调试日志
-                    logger.info(f"DHT11读取结果: temperature={temperature}, humidity={humidity}")
+                    # 写入内存环形缓冲区
+                    self.recent_buffer.append(
+                        to_epoch_ms(), [readings[field] for field in SENSOR_FIELDS]
+                    )
+                    self.recorded_readings = readings
+                    last_record_time = current_time
                     
-                    if temperature is not None and humidity is not None:
-                        self.latest_readings["air_temperature"] = temperature
-                        self.latest_readings["air_humidity"] = humidity
-                        logger.info("使用真实传感器数据")
-                    else:
-                        temp_variation = random.uniform(-TEMPERATURE_VARIATION, TEMPERATURE_VARIATION)
-                        humidity_variation = random.uniform(-HUMIDITY_VARIATION, HUMIDITY_VARIATION)
-                        
-                        mock_temp = MOCK_TEMPERATURE_BASE + temp_variation
-                        mock_humidity = MOCK_HUMIDITY_BASE + humidity_variation
-                        
-                        self.latest_readings["air_temperature"] = mock_temp
-                        self.latest_readings["air_humidity"] = mock_humidity
-                        
-                        # 添加调试日志
-                        logger.info(f"使用模拟数据: temp={mock_temp:.1f}, humidity={mock_humidity:.1f}")
-                        
-                    last_dht_reading = current_time
-                
-                # 添加日志显示最终读数
-                logger.info(f"最终读数: air_temperature={self.latest_readings['air_temperature']:.1f}, air_humidity={self.latest_readings['air_humidity']:.1f}")
-                
-                # 其他传感器读取...
-                # 读取土壤湿度
-                soil_moisture = self._read_soil_moisture()
-                if soil_moisture is not None:
-                    self.latest_readings["soil_moisture"] = soil_moisture
-                
-                # 读取土壤温度
-                soil_temp = self._read_soil_temperature()
-                if soil_temp is not None:
-                    self.latest_readings["soil_temperature"] = soil_temp
+                    # 定期保存数据到数据库
+                    if current_time - last_save_time >= SYSTEM_CONFIG["DATA_SAVE_INTERVAL"] * factor - tolerance:
+                        self._save_to_database(readings)
+                        last_save_time = current_time
                 
-                # 读取光照强度
-                light_intensity = self._read_light_intensity()
-                if light_intensity is not None:
-                    self.latest_readings["light_intensity"] = light_intensity
-                
-                # 更新时间戳
-                self.latest_readings["timestamp"] = datetime.now().isoformat()
-                
-                # 更新OLED显示
-                self._update_oled()
-                
-                # 定期保存数据到数据库
-                if current_time - last_save_time >= SYSTEM_CONFIG["DATA_SAVE_INTERVAL"]:
-                    self._save_to_database()
-                    last_save_time = current_time
-                
-                # 等待下一次读取
+                # 等待下一次记录
                 time.sleep(SYSTEM_CONFIG["READING_INTERVAL"])
                 
             except Exception as e:
                 logger.error(f"数据采集循环异常: {e}")
-                time.sleep(5)
                 time.sleep(5)  # 出错后等待5秒再尝试
     
+    def get_soil_temperatures(self):
+        """获取各DS18B20探头最近一次的土壤温度 {探头ID: 温度}"""
+        return dict(self.soil_temperatures)
+    
+    def get_adc_voltages(self):
+        """获取ADS1115各通道最近一次的电压（包括未接传感器的备用通道）"""
+        if self.adc is None:
+            return {}
+        return self.adc.get_voltages()
+    
+    def get_statistics(self, precision=None):
+        """获取各通道在1m/15m/1h等窗口内的均值、最小/最大值、标准差和变化率(每分钟)"""
+        return self.stats.get_stats(time.monotonic(), precision)
+    
+    def get_sampling_state(self):
+        """获取自适应采样状态（各任务的降频倍数和各通道状态），未启用时返回None"""
+        if self.adaptive is None:
+            return None
+        return self.adaptive.get_state()
+    
+    def get_acquisition_stats(self):
+        """获取各采集任务的统计信息（读取次数、超时、跳过等）"""
+        return self.scheduler.get_stats()
+    
+    @property
+    def latest_readings(self):
+        """最新的读数快照（只读）"""
+        return self.readings.get()
+    
     def get_latest_readings(self):
-        """获取最新的传感器读数"""
-        return self.latest_readings
+        """获取最新的传感器读数快照（只读，快照的seq属性为序号）"""
+        return self.readings.get()
+    
+    def wait_for_update(self, after_seq, timeout=None):
+        """等待序号大于after_seq的读数快照，超时返回当前快照"""
+        return self.readings.wait_for_update(after_seq, timeout)
     
     def get_sensor_status(self):
         """获取传感器状态"""
         return self.sensor_status
     
-    def get_historical_data(self, hours=24):
-        """获取历史数据"""
+    def get_recorded_readings(self):
+        """获取最近一次记录的读数快照（按READING_INTERVAL更新，比最新读数变化慢）"""
+        return self.recorded_readings
+    
+    def get_history_version(self, hours, resolution):
+        """历史查询结果的数据版本，版本不变时相同参数的查询结果不变
+        
+        由环形缓冲区返回的查询以缓冲区写入次数为版本，
+        SQLite查询（包括汇总表）以数据库提交批次数为版本。
+        """
+        start_ms = to_epoch_ms() - int(hours * 3600 * 1000)
+        if resolution in ("raw", "auto") and self._buffer_covers(start_ms):
+            return "buffer", self.recent_buffer.seq
+        return "db", self.db_writer.commit_seq
+    
+    def _buffer_covers(self, start_ms):
+        """环形缓冲区是否包含从start_ms开始的全部数据"""
+        oldest = self.recent_buffer.oldest_ms()
+        if oldest is None:
+            return False
+        return oldest <= start_ms + SYSTEM_CONFIG["READING_INTERVAL"] * 1000
+    
+    def _query_history_columns(self, hours, resolution, precision):
+        """按时间范围查询历史数据，返回列式字典"""
+        span_ms = int(hours * 3600 * 1000)
+        start_ms = to_epoch_ms() - span_ms
+        
+        # 环形缓冲区覆盖整个时间范围时直接从内存返回
+        if resolution in ("raw", "auto") and self._buffer_covers(start_ms):
+            ts_ms, values = self.recent_buffer.query(start_ms)
+            if resolution == "auto":
+                ts_ms, values = downsample(ts_ms, values, SYSTEM_CONFIG.get("HISTORY_MAX_POINTS", 500))
+            return to_columns(ts_ms, values, SENSOR_FIELDS, LOCAL_OFFSET_MS, precision)
+        
+        if resolution == "auto":
+            resolution = choose_resolution(span_ms)
+        elif resolution not in HISTORY_RESOLUTIONS:
+            raise ValueError(f"不支持的历史数据分辨率: {resolution}")
+        
+        conn = sqlite3.connect(SYSTEM_CONFIG["DATABASE_FILE"])
         try:
-            conn = sqlite3.connect(SYSTEM_CONFIG["DATABASE_FILE"])
-            cursor = conn.cursor()
-            
-            # 查询最近n小时的数据
-            cursor.execute('''
-            SELECT timestamp, air_temperature, air_humidity, soil_moisture, 
-                   soil_temperature, light_intensity
-            FROM sensor_data
-            WHERE timestamp >= datetime('now', ?) 
-            ORDER BY timestamp
-            ''', (f'-{hours} hours',))
-            
-            data = cursor.fetchall()
+            # 查询最近n小时的数据（按ts_ms索引或汇总表范围扫描，原始数据包含归档段）
+            columns = query_history_columns(conn, start_ms, resolution=resolution, archive=self.archive)
+        finally:
             conn.close()
-            
-            # 格式化数据
-            formatted_data = []
-            for row in data:
-                formatted_data.append({
-                    "timestamp": row[0],
-                    "air_temperature": row[1],
-                    "air_humidity": row[2],
-                    "soil_moisture": row[3],
-                    "soil_temperature": row[4],
-                    "light_intensity": row[5]
-                })
-            
-            return formatted_data
+        if precision is not None:
+            round_columns(columns, precision)
+        return columns
+    
+    def query_historical(self, hours=24, resolution="raw", precision=None, columns=False):
+        """查询历史数据，参数同get_historical_data，columns为True时返回列式字典
         
+        查询失败时抛出异常而不是返回空结果，供需要区分失败和无数据的调用方使用。
+        """
+        data = self._query_history_columns(hours, resolution, precision)
+        return data if columns else columns_to_records(data)
+    
+    def get_historical_data(self, hours=24, resolution="raw", precision=None):
+        """获取历史数据
+        
+        Args:
+            hours: 查询最近多少小时
+            resolution: raw/1m/1h/1d，或auto按时间范围自动选择汇总级别；
+                raw和auto在环形缓冲区覆盖范围内时返回内存中的采样数据
+            precision: 数值保留的小数位数，None为不舍入
+        
+        Returns:
+            list: 每行一个字典
+        """
+        try:
+            return columns_to_records(self._query_history_columns(hours, resolution, precision))
         except Exception as e:
             logger.error(f"获取历史数据失败: {e}")
             return []
     
+    def get_historical_columns(self, hours=24, resolution="raw", precision=None):
+        """获取列式历史数据：timestamp及每个字段各一个数组，参数同get_historical_data
+        
+        Returns:
+            dict: 列名 -> 值列表
+        """
+        try:
+            return self._query_history_columns(hours, resolution, precision)
+        except Exception as e:
+            logger.error(f"获取历史数据失败: {e}")
+            return {}
+    
+    def iter_historical_data(self, start_ms, end_ms=None):
+        """分块迭代任意时间范围的原始数据（用于流式导出）
+        
+        Args:
+            start_ms: 起始时间(毫秒，含)
+            end_ms: 结束时间(毫秒，不含)，为None时到最新
+        
+        Yields:
+            list: (ts_ms, timestamp, 各字段值...) 元组列表
+        """
+        conn = sqlite3.connect(SYSTEM_CONFIG["DATABASE_FILE"])
+        try:
+            yield from iter_history(conn, start_ms, end_ms, archive=self.archive)
+        finally:
+            conn.close()
+    
     def cleanup(self):
         """清理资源"""
         logger.info("正在清理传感器模块资源...")
         self.running = False
         
+        self.scheduler.stop()
+        
         if self.collect_thread.is_alive():
             self.collect_thread.join(timeout=2.0)
         
+        # 提交写入队列中剩余的数据并关闭数据库连接
+        self.db_writer.stop()
+        if self.archive is not None:
+            self.archive.close()
+        
+        if self.display is not None:
+            self.display.stop()
+        
         if self.oled:
             try:
                 self.oled.fill(0)
@@ -623,5 +742,8 @@ class SensorModule:
             except:
                 pass
         
+        if self.dht_reader is not None:
+            self.dht_reader.close()
+        
         GPIO.cleanup()
         logger.info("传感器模块资源已清理")
\ No newline at end of file
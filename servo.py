@@ -0,0 +1,141 @@
+"""
+舵机模块 - 后台线程执行舵机平滑运动
+"""
+
+import logging
+import threading
+import time
+
+from logsetup import setup_logging
+
+# 配置日志
+setup_logging()
+
+logger = logging.getLogger("Servo")
+
+# 到达目标后保持脉冲的时间(秒)，之后停止PWM防止抖动
+SETTLE_TIME_S = 0.05
+
+
+class ServoMotionPlanner:
+    """舵机运动规划线程
+
+    只有该线程驱动舵机。set_target只更新目标角度并立即返回；
+    运动过程中每一步都重新读取目标，新目标会让舵机从当前位置直接转向，
+    不会排在上一次运动之后。
+    """
+
+    def __init__(self, pwm, angle_to_duty, angle, step=2, step_interval=0.02, on_arrive=None):
+        """初始化规划器
+
+        Args:
+            pwm: 舵机的PWM对象(需支持ChangeDutyCycle)
+            angle_to_duty: 角度到占空比的转换函数
+            angle: 舵机当前角度
+            step: 每步转动的角度
+            step_interval: 每步的间隔(秒)
+            on_arrive: 到达目标后的回调 on_arrive(angle)，在规划线程中调用
+        """
+        self.pwm = pwm
+        self.angle_to_duty = angle_to_duty
+        self.step = step
+        self.step_interval = step_interval
+        self.on_arrive = on_arrive
+
+        self.current = angle
+        self.target = angle
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        """启动规划线程"""
+        self.running = True
+        self.thread = threading.Thread(target=self._motion_loop, name="servo-planner")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def set_target(self, angle):
+        """设置目标角度（非阻塞）"""
+        with self.condition:
+            self.target = angle
+            self.condition.notify_all()
+
+    def is_moving(self):
+        with self.condition:
+            return self.current != self.target
+
+    def wait_idle(self, timeout=None):
+        """等待舵机到达目标
+
+        Returns:
+            bool: 是否在超时前到达
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: self.current == self.target, timeout)
+
+    def _motion_loop(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: not self.running or self.current != self.target)
+                if not self.running:
+                    return
+
+            try:
+                arrived = self._move()
+            except Exception as e:
+                logger.error(f"舵机运动失败: {e}")
+                # 放弃本次运动，避免反复重试
+                with self.condition:
+                    self.target = self.current
+                    self.condition.notify_all()
+                continue
+
+            if arrived is not None and self.on_arrive is not None:
+                try:
+                    self.on_arrive(arrived)
+                except Exception as e:
+                    logger.error(f"舵机到位回调失败: {e}")
+
+    def _move(self):
+        """朝目标逐步移动，直到到达（移动中目标改变时随时转向）
+
+        Returns:
+            int: 到达的角度，停止时返回None
+        """
+        while self.running:
+            with self.condition:
+                target = self.target
+                current = self.current
+
+            if abs(current - target) > 1:
+                current += self.step if target > current else -self.step
+                self.pwm.ChangeDutyCycle(self.angle_to_duty(current))
+                with self.condition:
+                    self.current = current
+                time.sleep(self.step_interval)
+                continue
+
+            # 最终位置
+            self.pwm.ChangeDutyCycle(self.angle_to_duty(target))
+            time.sleep(SETTLE_TIME_S)
+
+            with self.condition:
+                if self.target != target:
+                    # 稳定期间收到新目标，继续移动
+                    self.current = target
+                    continue
+                # 停止PWM信号以防止抖动
+                self.pwm.ChangeDutyCycle(0)
+                self.current = target
+                self.condition.notify_all()
+            return target
+        return None
+
+    def stop(self, timeout=2.0):
+        """停止规划线程"""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread is not None and self.thread.is_alive():
+            self.thread.join(timeout=timeout)
@@ -10,6 +10,10 @@ let humidityChart;
 let soilChart;
 let lightChart;
 let isConnected = false;
+// һ״̬汾ţstatus_deltaڴ˻Ϻϲ
+let statusState = null;
+let statusVersion = 0;
+let resyncPending = false;
 let deviceId = window.location.pathname.split('/').pop();
 // ĵɺִ
 document.addEventListener('DOMContentLoaded', function() {
@@ -58,6 +62,9 @@ function initWebSocket() {
         console.log('ѶϿ');
         isConnected = false;
         updateConnectionStatus(false);
+        // ·״̬
+        statusState = null;
+        resyncPending = false;
     });
     
     // Ӵ¼
@@ -67,16 +74,58 @@ function initWebSocket() {
         updateConnectionStatus(false);
     });
     
-    // ״̬¼
+    // ״̬¼״̬
     socket.on('status_update', function(data) {
         console.log('յ״̬:', data);
-        updateDashboard(data);
-        updateControlPanel(data);
-        updateCharts(data);
-        updateThresholdForm(data);
+        statusState = data;
+        statusVersion = data.version || 0;
+        resyncPending = false;
+        applyStatus(statusState);
+    });
+    
+    // ״̬¼ֻ仯ֶΣ
+    socket.on('status_delta', function(delta) {
+        if (statusState === null || delta.base !== statusVersion) {
+            // ȱٻ׼汾״̬
+            if (!resyncPending) {
+                console.warn('״̬汾ͬ:', statusVersion, delta.base);
+                resyncPending = true;
+                socket.emit('request_resync');
+            }
+            return;
+        }
+        mergeStatus(statusState, delta.changes);
+        statusState.system_time = delta.system_time;
+        statusVersion = delta.version;
+        applyStatus(statusState);
     });
 }
 
+/**
+ * ϲ״ֵֶ̬ΰӼϲֶ滻
+ */
+function mergeStatus(state, changes) {
+    for (const key in changes) {
+        const value = changes[key];
+        if (value !== null && typeof value === 'object' && !Array.isArray(value) &&
+                state[key] !== null && typeof state[key] === 'object') {
+            Object.assign(state[key], value);
+        } else {
+            state[key] = value;
+        }
+    }
+}
+
+/**
+ * ״̬ˢҳ
+ */
+function applyStatus(data) {
+    updateDashboard(data);
+    updateControlPanel(data);
+    updateCharts(data);
+    updateThresholdForm(data);
+}
+
 /**
  * ״̬ʾ
  */
@@ -303,10 +352,11 @@ function initCharts() {
  * ȡʷ
  */
 function fetchHistoricalData() {
-    fetch('/api/history?hours=24')
+    // ʽݣÿֶһ飬ֱΪͼ
+    fetch('/api/data/history?hours=24&format=columns&precision=1')
         .then(response => response.json())
         .then(data => {
-            if (data && data.length > 0) {
+            if (data && data.timestamp && data.timestamp.length > 0) {
                 updateChartsWithHistoricalData(data);
             }
         })
@@ -316,29 +366,19 @@ function fetchHistoricalData() {
 }
 
 /**
- * ʹʷݸͼ
+ * ʹʷݸͼʽݣ
  */
 function updateChartsWithHistoricalData(data) {
-    // ׼
-    const labels = [];
-    const airTempData = [];
-    const soilTempData = [];
-    const airHumidityData = [];
-    const soilMoistureData = [];
-    const lightIntensityData = [];
-    
-    // 
-    data.forEach(entry => {
-        const date = new Date(entry.timestamp);
-        const timeLabel = date.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
-        
-        labels.push(timeLabel);
-        airTempData.push(entry.air_temperature);
-        soilTempData.push(entry.soil_temperature);
-        airHumidityData.push(entry.air_humidity);
-        soilMoistureData.push(entry.soil_moisture);
-        lightIntensityData.push(entry.light_intensity);
+    // ʱǩ
+    const labels = data.timestamp.map(timestamp => {
+        const date = new Date(timestamp);
+        return date.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
     });
+    const airTempData = data.air_temperature;
+    const soilTempData = data.soil_temperature;
+    const airHumidityData = data.air_humidity;
+    const soilMoistureData = data.soil_moisture;
+    const lightIntensityData = data.light_intensity;
     
     // ¶ͼ
     temperatureChart.data.labels = labels;
@@ -0,0 +1,152 @@
+"""
+统计模块 - 传感器通道的滑动窗口流式统计
+"""
+
+import math
+import threading
+from collections import deque
+
+
+class RollingWindow:
+    """单个时间窗口的增量统计
+
+    样本按时间顺序进入，过期样本从队首移出；均值和标准差由累计和维护，
+    最小/最大值由单调队列维护，每个样本的摊还开销为O(1)。
+    """
+
+    def __init__(self, window):
+        """初始化窗口
+
+        Args:
+            window: 窗口长度(秒)
+        """
+        self.window = window
+        self.samples = deque()
+        # 以第一个样本为基准平移后累计，避免大数值时方差计算损失精度
+        self.shift = None
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.min_queue = deque()  # 值单调递增
+        self.max_queue = deque()  # 值单调递减
+
+    def add(self, t, value):
+        """加入一个样本
+
+        Args:
+            t: 单调时间(秒)
+            value: 数值
+        """
+        if self.shift is None:
+            self.shift = value
+        d = value - self.shift
+        self.samples.append((t, value))
+        self.sum += d
+        self.sum_sq += d * d
+
+        while self.min_queue and self.min_queue[-1][1] >= value:
+            self.min_queue.pop()
+        self.min_queue.append((t, value))
+        while self.max_queue and self.max_queue[-1][1] <= value:
+            self.max_queue.pop()
+        self.max_queue.append((t, value))
+
+        self._expire(t)
+
+    def _expire(self, now):
+        """移出早于窗口起点的样本"""
+        cutoff = now - self.window
+        while self.samples and self.samples[0][0] < cutoff:
+            _, old = self.samples.popleft()
+            d = old - self.shift
+            self.sum -= d
+            self.sum_sq -= d * d
+        while self.min_queue and self.min_queue[0][0] < cutoff:
+            self.min_queue.popleft()
+        while self.max_queue and self.max_queue[0][0] < cutoff:
+            self.max_queue.popleft()
+
+        if not self.samples:
+            # 窗口清空后重置累计值，消除浮点误差的积累
+            self.shift = None
+            self.sum = 0.0
+            self.sum_sq = 0.0
+
+    def get_stats(self, now=None):
+        """获取窗口统计
+
+        Args:
+            now: 当前单调时间，给定时先移出过期样本
+
+        Returns:
+            dict: count, mean, min, max, stddev, rate(每分钟变化量)；窗口为空时数值为None
+        """
+        if now is not None:
+            self._expire(now)
+        n = len(self.samples)
+        if n == 0:
+            return {"count": 0, "mean": None, "min": None, "max": None, "stddev": None, "rate": None}
+
+        mean_d = self.sum / n
+        variance = max(0.0, self.sum_sq / n - mean_d * mean_d)
+
+        (t0, v0), (t1, v1) = self.samples[0], self.samples[-1]
+        rate = (v1 - v0) / (t1 - t0) * 60 if t1 > t0 else 0.0
+
+        return {
+            "count": n,
+            "mean": self.shift + mean_d,
+            "min": self.min_queue[0][1],
+            "max": self.max_queue[0][1],
+            "stddev": math.sqrt(variance),
+            "rate": rate,
+        }
+
+
+class StreamingStats:
+    """多通道、多窗口的流式统计"""
+
+    def __init__(self, fields, windows):
+        """初始化
+
+        Args:
+            fields: 通道名序列
+            windows: {窗口名: 窗口长度(秒)}，如 {"1m": 60, "15m": 900, "1h": 3600}
+        """
+        self.lock = threading.Lock()
+        self.windows = dict(windows)
+        self.channels = {
+            field: {name: RollingWindow(seconds) for name, seconds in windows.items()}
+            for field in fields
+        }
+
+    def add(self, field, t, value):
+        """加入一个样本，未知通道或None值忽略"""
+        windows = self.channels.get(field)
+        if windows is None or value is None:
+            return
+        with self.lock:
+            for window in windows.values():
+                window.add(t, value)
+
+    def get_stats(self, now=None, precision=None):
+        """获取所有通道的统计
+
+        Args:
+            now: 当前单调时间，用于移出过期样本
+            precision: 数值保留的小数位数，None为不舍入
+
+        Returns:
+            dict: {通道名: {窗口名: {count, mean, min, max, stddev, rate}}}
+        """
+        result = {}
+        with self.lock:
+            for field, windows in self.channels.items():
+                result[field] = {name: window.get_stats(now) for name, window in windows.items()}
+
+        if precision is not None:
+            for windows in result.values():
+                for stats in windows.values():
+                    for key, value in stats.items():
+                        if isinstance(value, float):
+                            stats[key] = round(value, precision)
+        return result
@@ -0,0 +1,593 @@
+"""
+数据存储模块 - 负责将传感器数据批量写入SQLite数据库
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# 导入配置文件
+from config import SYSTEM_CONFIG
+from logsetup import setup_logging
+
+# 配置日志
+setup_logging()
+
+logger = logging.getLogger("Storage")
+
+# 允许的synchronous级别
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL")
+
+# 数据库结构版本（PRAGMA user_version）
+SCHEMA_VERSION = 2
+
+# 传感器数据字段
+SENSOR_FIELDS = (
+    "air_temperature",
+    "air_humidity",
+    "soil_moisture",
+    "soil_temperature",
+    "light_intensity",
+)
+
+# 汇总表级别: (名称, 桶宽毫秒)，按从细到粗排列
+ROLLUP_LEVELS = (
+    ("1m", 60 * 1000),
+    ("1h", 3600 * 1000),
+    ("1d", 86400 * 1000),
+)
+
+# 历史查询支持的分辨率
+HISTORY_RESOLUTIONS = ("raw",) + tuple(name for name, _ in ROLLUP_LEVELS)
+
+# 本地时区偏移(毫秒)，使日汇总桶按本地零点对齐
+LOCAL_OFFSET_MS = time.localtime().tm_gmtoff * 1000
+
+# 唤醒写入线程处理flush请求或停止的队列标记（队列满时可被丢弃）
+_WAKE = object()
+
+
+def to_epoch_ms(dt=None):
+    """将datetime（本地时间）转换为毫秒时间戳"""
+    if dt is None:
+        return int(time.time() * 1000)
+    return int(dt.timestamp() * 1000)
+
+
+def _iso_to_epoch_ms(value):
+    """将旧数据的ISO时间字符串转换为毫秒时间戳（迁移用）"""
+    try:
+        return to_epoch_ms(datetime.fromisoformat(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def rollup_table(name):
+    """汇总表名"""
+    return f"sensor_rollup_{name}"
+
+
+def bucket_start(ts_ms, bucket_ms):
+    """计算时间戳所在汇总桶的起始时间（按本地时间对齐）"""
+    return (ts_ms + LOCAL_OFFSET_MS) // bucket_ms * bucket_ms - LOCAL_OFFSET_MS
+
+
+def _create_rollup_tables(conn):
+    """创建1分钟/1小时/1天汇总表，每个字段保存min/max/sum/count"""
+    columns = []
+    for field in SENSOR_FIELDS:
+        columns += [f"{field}_min REAL", f"{field}_max REAL",
+                    f"{field}_sum REAL", f"{field}_count INTEGER NOT NULL DEFAULT 0"]
+    for name, _ in ROLLUP_LEVELS:
+        conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {rollup_table(name)} (
+            bucket_ms INTEGER PRIMARY KEY,
+            {", ".join(columns)}
+        )
+        ''')
+
+
+def _backfill_rollups(conn):
+    """从原始数据重建汇总表"""
+    aggregates = []
+    for field in SENSOR_FIELDS:
+        aggregates += [f"min({field})", f"max({field})", f"sum({field})", f"count({field})"]
+    for name, bucket_ms in ROLLUP_LEVELS:
+        conn.execute(f'''
+        INSERT OR REPLACE INTO {rollup_table(name)}
+        SELECT (ts_ms + {LOCAL_OFFSET_MS}) / {bucket_ms} * {bucket_ms} - {LOCAL_OFFSET_MS} AS bucket,
+               {", ".join(aggregates)}
+        FROM sensor_data
+        WHERE ts_ms IS NOT NULL
+        GROUP BY bucket
+        ''')
+
+
+def _rollup_upsert_sql(name):
+    """生成汇总表的增量更新语句"""
+    columns = ["bucket_ms"]
+    updates = []
+    for field in SENSOR_FIELDS:
+        columns += [f"{field}_min", f"{field}_max", f"{field}_sum", f"{field}_count"]
+        updates += [
+            f"{field}_min = coalesce(min({field}_min, excluded.{field}_min), {field}_min, excluded.{field}_min)",
+            f"{field}_max = coalesce(max({field}_max, excluded.{field}_max), {field}_max, excluded.{field}_max)",
+            f"{field}_sum = coalesce({field}_sum, 0) + coalesce(excluded.{field}_sum, 0)",
+            f"{field}_count = {field}_count + excluded.{field}_count",
+        ]
+    return f'''
+    INSERT INTO {rollup_table(name)} ({", ".join(columns)})
+    VALUES ({", ".join("?" * len(columns))})
+    ON CONFLICT(bucket_ms) DO UPDATE SET {", ".join(updates)}
+    '''
+
+
+def aggregate_rows(rows, bucket_ms):
+    """在内存中把一批数据行按桶预聚合
+
+    Args:
+        rows: (ts_ms, timestamp, 各字段值...) 序列
+        bucket_ms: 桶宽(毫秒)
+
+    Returns:
+        list: 可直接用于汇总表upsert的参数行
+    """
+    buckets = {}
+    for row in rows:
+        ts_ms = row[0]
+        if ts_ms is None:
+            continue
+        bucket = bucket_start(ts_ms, bucket_ms)
+        stats = buckets.get(bucket)
+        if stats is None:
+            stats = buckets[bucket] = [[None, None, 0.0, 0] for _ in SENSOR_FIELDS]
+        for stat, value in zip(stats, row[2:]):
+            if value is None:
+                continue
+            stat[0] = value if stat[0] is None else min(stat[0], value)
+            stat[1] = value if stat[1] is None else max(stat[1], value)
+            stat[2] += value
+            stat[3] += 1
+
+    params = []
+    for bucket, stats in buckets.items():
+        values = [bucket]
+        for stat in stats:
+            values += stat
+        params.append(values)
+    return params
+
+
+def choose_resolution(span_ms, max_points=None, raw_interval=None):
+    """为给定时间范围选择分辨率
+
+    返回点数不超过max_points的最细分辨率；原始数据的点数按保存间隔估算。
+    """
+    max_points = max_points or SYSTEM_CONFIG.get("HISTORY_MAX_POINTS", 500)
+    raw_interval = raw_interval or SYSTEM_CONFIG["DATA_SAVE_INTERVAL"]
+
+    if span_ms / (raw_interval * 1000) <= max_points:
+        return "raw"
+    for name, bucket_ms in ROLLUP_LEVELS:
+        if span_ms / bucket_ms <= max_points:
+            return name
+    return ROLLUP_LEVELS[-1][0]
+
+
+def query_history_columns(conn, start_ms, end_ms=None, resolution="raw", archive=None):
+    """查询历史数据（列式）
+
+    Args:
+        conn: SQLite连接
+        start_ms: 起始时间(毫秒，含)
+        end_ms: 结束时间(毫秒，不含)，为None时到最新
+        resolution: raw或汇总级别名称(1m/1h/1d)
+        archive: 冷数据归档(SegmentArchive)，raw查询时先读取归档段再拼接数据库中的数据
+
+    Returns:
+        dict: 列名 -> 值列表，包含timestamp和各字段；汇总数据的字段值为平均值，另附min/max列
+    """
+    if end_ms is None:
+        end_ms = to_epoch_ms() + 1
+
+    if resolution == "raw":
+        if archive is not None:
+            columns = archive.query_columns(start_ms, end_ms)
+        else:
+            columns = {name: [] for name in ("timestamp",) + SENSOR_FIELDS}
+        rows = conn.execute(f'''
+        SELECT timestamp, {", ".join(SENSOR_FIELDS)}
+        FROM sensor_data
+        WHERE ts_ms >= ? AND ts_ms < ?
+        ORDER BY ts_ms
+        ''', (start_ms, end_ms)).fetchall()
+        if rows:
+            for column, values in zip(columns.values(), zip(*rows)):
+                column.extend(values)
+        return columns
+
+    bucket_ms = dict(ROLLUP_LEVELS)[resolution]
+    names = ["timestamp"]
+    selects = []
+    for field in SENSOR_FIELDS:
+        names += [field, f"{field}_min", f"{field}_max"]
+        selects += [f"CASE WHEN {field}_count THEN {field}_sum / {field}_count END",
+                    f"{field}_min", f"{field}_max"]
+    rows = conn.execute(f'''
+    SELECT bucket_ms, {", ".join(selects)}
+    FROM {rollup_table(resolution)}
+    WHERE bucket_ms >= ? AND bucket_ms < ?
+    ORDER BY bucket_ms
+    ''', (bucket_start(start_ms, bucket_ms), end_ms)).fetchall()
+
+    columns = {name: [] for name in names}
+    if rows:
+        for column, values in zip(columns.values(), zip(*rows)):
+            column.extend(values)
+        columns["timestamp"] = [datetime.fromtimestamp(ts / 1000).isoformat() for ts in columns["timestamp"]]
+    return columns
+
+
+def round_columns(columns, precision):
+    """按给定小数位数舍入列式数据中的数值列"""
+    for name, values in columns.items():
+        if name != "timestamp":
+            columns[name] = [None if v is None else round(v, precision) for v in values]
+    return columns
+
+
+def columns_to_records(columns):
+    """列式数据转换为每行一个字典的列表"""
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
+def query_history(conn, start_ms, end_ms=None, resolution="raw", archive=None):
+    """查询历史数据
+
+    参数同query_history_columns。
+
+    Returns:
+        list: 每行一个字典；汇总数据的字段值为平均值，另附min/max
+    """
+    return columns_to_records(query_history_columns(conn, start_ms, end_ms, resolution, archive))
+
+
+def iter_history(conn, start_ms, end_ms=None, archive=None, chunk_size=500):
+    """分块迭代原始历史数据
+
+    先逐段读取归档，再用游标fetchmany分批读取数据库，内存占用与时间范围无关。
+
+    Yields:
+        list: (ts_ms, timestamp, 各字段值...) 元组列表
+    """
+    if end_ms is None:
+        end_ms = to_epoch_ms() + 1
+
+    if archive is not None:
+        yield from archive.iter_rows(start_ms, end_ms, chunk_size)
+
+    cursor = conn.execute(f'''
+    SELECT ts_ms, timestamp, {", ".join(SENSOR_FIELDS)}
+    FROM sensor_data
+    WHERE ts_ms >= ? AND ts_ms < ?
+    ORDER BY ts_ms
+    ''', (start_ms, end_ms))
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield rows
+
+
+def migrate_schema(conn):
+    """创建或升级数据库表结构
+
+    版本1: 新增整数毫秒时间戳列ts_ms及覆盖索引，历史查询按索引范围扫描。
+    版本2: 新增1分钟/1小时/1天汇总表，并由已有数据回填。
+    """
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS sensor_data (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        air_temperature REAL,
+        air_humidity REAL,
+        soil_moisture REAL,
+        soil_temperature REAL,
+        light_intensity REAL,
+        ts_ms INTEGER
+    )
+    ''')
+
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+
+    with conn:
+        if version < 1:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(sensor_data)")]
+            if "ts_ms" not in columns:
+                logger.info("迁移数据库: 添加ts_ms列")
+                conn.execute("ALTER TABLE sensor_data ADD COLUMN ts_ms INTEGER")
+
+            # 回填旧数据（旧时间戳为本地时间的isoformat字符串）
+            conn.create_function("iso_to_epoch_ms", 1, _iso_to_epoch_ms)
+            cursor = conn.execute(
+                "UPDATE sensor_data SET ts_ms = iso_to_epoch_ms(timestamp) WHERE ts_ms IS NULL"
+            )
+            if cursor.rowcount:
+                logger.info(f"迁移数据库: 已回填 {cursor.rowcount} 行时间戳")
+
+            # 覆盖索引：范围查询无需回表
+            conn.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_sensor_data_ts_ms
+            ON sensor_data (ts_ms, timestamp, {", ".join(SENSOR_FIELDS)})
+            ''')
+
+        if version < 2:
+            logger.info("迁移数据库: 创建汇总表")
+            _create_rollup_tables(conn)
+            _backfill_rollups(conn)
+
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+class DatabaseWriter:
+    """数据库写入线程
+
+    持有一个长期打开的WAL模式连接，采集线程只把数据行放入有界队列，
+    由写入线程按行数或时间间隔分组提交，避免每条数据都fsync一次SD卡。
+    汇总表在同一事务中增量更新。
+    """
+
+    def __init__(self, db_file=None, queue_size=None, batch_size=None,
+                 commit_interval=None, synchronous=None, archive=None):
+        """初始化数据库写入器
+
+        Args:
+            db_file: 数据库文件路径
+            queue_size: 内存队列最大行数，队列满时丢弃最旧的数据
+            batch_size: 累积多少行后立即提交
+            commit_interval: 最长提交间隔(秒)
+            synchronous: SQLite synchronous级别 (NORMAL/OFF/FULL)
+            archive: 冷数据归档(SegmentArchive)，由写入线程定期执行压缩归档
+        """
+        self.db_file = db_file or SYSTEM_CONFIG["DATABASE_FILE"]
+        self.batch_size = batch_size or SYSTEM_CONFIG.get("DB_COMMIT_BATCH_SIZE", 50)
+        self.commit_interval = commit_interval or SYSTEM_CONFIG.get("DB_COMMIT_INTERVAL", 30.0)
+
+        self.synchronous = (synchronous or SYSTEM_CONFIG.get("DB_SYNCHRONOUS", "NORMAL")).upper()
+        if self.synchronous not in SYNCHRONOUS_MODES:
+            logger.warning(f"不支持的synchronous级别: {self.synchronous}，改用NORMAL")
+            self.synchronous = "NORMAL"
+
+        self.queue = queue.Queue(maxsize=queue_size or SYSTEM_CONFIG.get("DB_WRITER_QUEUE_SIZE", 1000))
+        self.dropped_rows = 0
+        # 等待提交完成的flush请求，不放入队列，避免队列满时被当作最旧数据丢弃
+        self.flush_waiters = []
+        self.flush_lock = threading.Lock()
+        # 成功提交的批次数，查询结果缓存以此判断数据库内容是否变化
+        self.commit_seq = 0
+
+        self.rollup_sql = {name: _rollup_upsert_sql(name) for name, _ in ROLLUP_LEVELS}
+
+        self.archive = archive
+        self.archive_interval = SYSTEM_CONFIG.get("ARCHIVE_CHECK_INTERVAL", 3600)
+
+        self.conn = None
+        self.running = False
+        self.writer_thread = None
+
+    def start(self):
+        """打开数据库连接并启动写入线程"""
+        if self.running:
+            logger.warning("数据库写入线程已在运行中")
+            return
+
+        self.running = True
+        ready = threading.Event()
+        self.writer_thread = threading.Thread(target=self._writer_loop, args=(ready,))
+        self.writer_thread.daemon = True
+        self.writer_thread.start()
+
+        # 等待连接与表结构就绪，保证启动后的查询能看到表
+        ready.wait(timeout=10.0)
+
+    def _open_connection(self):
+        """创建长连接并初始化表结构"""
+        conn = sqlite3.connect(self.db_file)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        migrate_schema(conn)
+        return conn
+
+    def submit(self, row):
+        """提交一行数据（非阻塞）
+
+        Args:
+            row: (ts_ms, timestamp, air_temperature, air_humidity,
+                  soil_moisture, soil_temperature, light_intensity)
+
+        Returns:
+            bool: 是否未丢弃任何数据
+        """
+        try:
+            self.queue.put_nowait(row)
+            return True
+        except queue.Full:
+            pass
+
+        # 队列已满：丢弃最旧的一行，保留最新数据（丢弃的是唤醒标记时没有丢失数据）
+        dropped = 0
+        try:
+            if self.queue.get_nowait() is not _WAKE:
+                dropped += 1
+        except queue.Empty:
+            pass
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            dropped += 1
+        if not dropped:
+            return True
+        self.dropped_rows += dropped
+        # 持续溢出时只间隔记录，避免日志刷屏
+        if self.dropped_rows == 1 or self.dropped_rows % 100 == 0:
+            logger.warning(f"数据库写入队列已满，已丢弃 {self.dropped_rows} 行数据")
+        return False
+
+    def flush(self, timeout=5.0):
+        """请求立即提交队列中的所有数据并等待完成"""
+        if not self.running:
+            return False
+        done = threading.Event()
+        with self.flush_lock:
+            self.flush_waiters.append(done)
+        # 队列已满时写入线程本来就不会阻塞，不需要唤醒标记
+        try:
+            self.queue.put_nowait(_WAKE)
+        except queue.Full:
+            pass
+        return done.wait(timeout)
+
+    def _commit(self, pending):
+        """分组提交一批数据"""
+        if not pending:
+            return True
+        try:
+            with self.conn:
+                self.conn.executemany('''
+                INSERT INTO sensor_data
+                (ts_ms, timestamp, air_temperature, air_humidity, soil_moisture, soil_temperature, light_intensity)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', pending)
+                for name, bucket_ms in ROLLUP_LEVELS:
+                    self.conn.executemany(self.rollup_sql[name], aggregate_rows(pending, bucket_ms))
+            self.commit_seq += 1
+            logger.debug(f"已批量写入 {len(pending)} 行数据")
+            return True
+        except Exception as e:
+            logger.error(f"批量写入数据库失败: {e}")
+            return False
+
+    def _compact_archive(self):
+        """把过期数据移入归档（在写入线程中执行，保持单一写入者）"""
+        try:
+            archived = self.archive.compact(self.conn)
+            if archived:
+                logger.info(f"归档完成，共移出 {archived} 行数据")
+        except Exception as e:
+            logger.error(f"归档过期数据失败: {e}")
+
+    def _writer_loop(self, ready):
+        """写入线程主循环"""
+        try:
+            self.conn = self._open_connection()
+            logger.info(f"数据库写入线程已启动 (WAL, synchronous={self.synchronous})")
+        except Exception as e:
+            logger.error(f"数据库初始化失败: {e}")
+            self.running = False
+            ready.set()
+            return
+        ready.set()
+
+        pending = []
+        flush_waiters = []
+        # 当前批次第一行到达的时间
+        batch_started = None
+        # 上次归档时间（启动后先执行一次）
+        last_compaction = None
+
+        while self.running or not self.queue.empty():
+            # 有待提交数据时只等到下一次提交时刻
+            if pending:
+                wait = max(0.0, self.commit_interval - (time.monotonic() - batch_started))
+            else:
+                wait = 1.0
+            if self.flush_waiters:
+                wait = 0.0
+
+            try:
+                item = self.queue.get(timeout=wait)
+            except queue.Empty:
+                item = None
+
+            # 在取空队列之前登记的flush请求，其之前提交的数据都已在队列中
+            with self.flush_lock:
+                flush_waiters.extend(self.flush_waiters)
+                self.flush_waiters = []
+
+            # 一次性取出队列中已有的数据
+            drained = True
+            while item is not None:
+                if item is not _WAKE:
+                    if not pending:
+                        batch_started = time.monotonic()
+                    pending.append(item)
+                if len(pending) >= self.batch_size:
+                    drained = False
+                    break
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            if pending and (flush_waiters or not self.running
+                            or len(pending) >= self.batch_size
+                            or time.monotonic() - batch_started >= self.commit_interval):
+                if self._commit(pending):
+                    pending = []
+                else:
+                    # 写入失败时保留数据等待下次重试，同时限制内存占用
+                    if len(pending) > self.queue.maxsize:
+                        del pending[:len(pending) - self.queue.maxsize]
+                    batch_started = time.monotonic()
+
+            # 队列未取空时剩余数据可能早于flush请求，下一轮取空后再通知
+            if drained and not pending:
+                for waiter in flush_waiters:
+                    waiter.set()
+                flush_waiters = []
+
+            if (self.archive is not None and self.running and not pending
+                    and (last_compaction is None
+                         or time.monotonic() - last_compaction >= self.archive_interval)):
+                self._compact_archive()
+                last_compaction = time.monotonic()
+
+        self._commit(pending)
+        with self.flush_lock:
+            flush_waiters.extend(self.flush_waiters)
+            self.flush_waiters = []
+        for waiter in flush_waiters:
+            waiter.set()
+
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+        self.conn = None
+        logger.info("数据库写入线程已停止")
+
+    def stop(self, timeout=None):
+        """停止写入线程，退出前提交所有剩余数据
+
+        Args:
+            timeout: 等待写入线程退出的最长时间(秒)，None表示等到最后一次提交完成
+        """
+        if not self.running:
+            return
+        self.running = False
+        # 唤醒阻塞在队列上的写入线程，否则要等到提交间隔结束才会退出；
+        # 队列已满时写入线程本来就不会阻塞
+        try:
+            self.queue.put_nowait(_WAKE)
+        except queue.Full:
+            pass
+        if self.writer_thread and self.writer_thread.is_alive():
+            self.writer_thread.join(timeout=timeout)
+            if self.writer_thread.is_alive():
+                logger.warning("数据库写入线程未在限定时间内退出，剩余数据可能未提交")
@@ -0,0 +1,8 @@
+"""
+测试配置 - 把项目根目录加入导入路径，测试不依赖树莓派硬件
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,49 @@
+"""
+自适应采样测试
+"""
+
+from types import SimpleNamespace
+
+from adaptive import ACTIVE, QUIET, UNKNOWN, AdaptiveSampler, classify
+from stats import StreamingStats
+
+DEADBAND = {"rate": 0.2, "stddev": 0.2}
+EMPTY = {"count": 1, "mean": 20.0, "min": 20.0, "max": 20.0, "stddev": None, "rate": None}
+STEADY = {"count": 10, "mean": 24.0, "min": 24.0, "max": 24.0, "stddev": 0.0, "rate": 0.0}
+
+
+def test_out_of_band_value_is_active_with_one_sample():
+    """窗口内只有一个样本时，越界读数也立即判为ACTIVE"""
+    assert classify(EMPTY, 40.0, DEADBAND, (18, 30), 0.1) == ACTIVE
+    assert classify(EMPTY, 24.0, DEADBAND, (18, 30), 0.1) == UNKNOWN
+
+
+def test_steady_in_band_value_is_quiet():
+    assert classify(STEADY, 24.0, DEADBAND, (18, 30), 0.1) == QUIET
+    assert classify(STEADY, 29.5, DEADBAND, (18, 30), 0.1) == ACTIVE
+
+
+class FakeScheduler:
+    def __init__(self, periods):
+        self.tasks = {name: SimpleNamespace(period=period) for name, period in periods.items()}
+
+    def set_period(self, name, period):
+        self.tasks[name].period = period
+
+
+def test_slowdown_keeps_two_samples_in_window():
+    """降频后的周期不超过统计窗口的一半，窗口内始终至少有两个样本"""
+    stats = StreamingStats(["soil_temperature"], {"1m": 60})
+    stats.get_stats = lambda now: {"soil_temperature": {"1m": STEADY}}
+    scheduler = FakeScheduler({"soil_temperature": 5.0})
+    readings = SimpleNamespace(get=lambda: {"soil_temperature": 18.0})
+    config = {"WINDOW": "1m", "MAX_SLOWDOWN": 8,
+              "DEADBANDS": {"soil_temperature": {"rate": 0.1, "stddev": 0.1}}}
+    sampler = AdaptiveSampler(scheduler, stats, readings,
+                              {"soil_temperature": ["soil_temperature"]}, config, {})
+
+    for _ in range(5):
+        sampler.evaluate()
+
+    assert sampler.factors["soil_temperature"] == 4
+    assert scheduler.tasks["soil_temperature"].period * 2 <= 60
@@ -0,0 +1,52 @@
+"""
+冷数据归档段文件测试
+"""
+
+import os
+
+import numpy as np
+
+from archive import SegmentArchive, write_segment
+from storage import SENSOR_FIELDS, to_epoch_ms
+
+DAY_START_MS = to_epoch_ms() - 40 * 86400 * 1000
+
+
+def write_day(archive, rows, mtime_ns=None):
+    ts_ms = DAY_START_MS + np.arange(rows, dtype=np.int64) * 1000
+    values = np.full((rows, len(SENSOR_FIELDS)), 20.0)
+    path = archive._segment_path(DAY_START_MS)
+    write_segment(path, ts_ms, values)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return path
+
+
+def test_rewritten_segment_closes_old_mapping(tmp_path):
+    """段文件被重写后旧映射被关闭，查询读到新内容"""
+    archive = SegmentArchive(tmp_path, retention_days=30)
+    path = write_day(archive, 10, mtime_ns=1_000_000_000)
+    ts_ms, _ = archive.query(DAY_START_MS)
+    assert len(ts_ms) == 10
+    old_segment = archive.segments[path][1]
+
+    write_day(archive, 25, mtime_ns=2_000_000_000)
+    ts_ms, _ = archive.query(DAY_START_MS)
+
+    assert len(ts_ms) == 25
+    assert old_segment.mm.closed
+    assert len(archive.segments) == 1
+
+
+def test_close_releases_all_segments(tmp_path):
+    archive = SegmentArchive(tmp_path, retention_days=30)
+    path = write_day(archive, 10)
+    archive.query(DAY_START_MS)
+    segment = archive.segments[path][1]
+
+    archive.close()
+
+    assert segment.mm.closed
+    assert archive.segments == {}
+    # 关闭后仍可重新映射查询
+    assert len(archive.query(DAY_START_MS)[0]) == 10
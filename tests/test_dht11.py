@@ -0,0 +1,66 @@
+"""
+DHT11边沿解码测试（使用合成的边沿时间戳）
+"""
+
+from dht11 import decode_dht11, high_pulse_widths
+
+
+def encode(humidity, temperature, checksum=None):
+    """按DHT11协议编码5个字节为40个数据位"""
+    data = [humidity, 0, temperature, 0]
+    data.append((sum(data) & 0xFF) if checksum is None else checksum)
+    return [(byte >> (7 - i)) & 1 for byte in data for i in range(8)]
+
+
+def trace(bits, start=0):
+    """生成一次传输的边沿序列: 主机释放总线、80us响应低/高电平、每位50us低电平+26/70us高电平"""
+    edges = []
+    tick = start
+
+    def edge(duration, level):
+        nonlocal tick
+        edges.append((tick & 0xFFFFFFFF, level))
+        tick += duration
+
+    edge(30, 1)    # 主机释放总线后上拉
+    edge(80, 0)    # 响应低电平
+    edge(80, 1)    # 响应高电平
+    for bit in bits:
+        edge(50, 0)
+        edge(70 if bit else 26, 1)
+    edge(50, 0)    # 结束
+    edge(0, 1)     # 释放总线
+    return edges
+
+
+def test_decode_valid_trace():
+    assert decode_dht11(trace(encode(55, 23))) == (55, 23)
+
+
+def test_decode_negative_temperature():
+    assert decode_dht11(trace(encode(40, 0x85))) == (40, -5)
+
+
+def test_bad_checksum_rejected():
+    assert decode_dht11(trace(encode(55, 23, checksum=0))) is None
+
+
+def test_truncated_capture_rejected():
+    edges = trace(encode(55, 23))
+    assert decode_dht11(edges[:60]) is None
+    assert decode_dht11([]) is None
+
+
+def test_tick_wraparound():
+    """32位微秒计数在传输中途回绕时宽度仍然正确"""
+    edges = trace(encode(61, 19), start=0xFFFFFFFF - 1500)
+    assert edges[-1][0] < edges[0][0]
+    assert decode_dht11(edges) == (61, 19)
+    assert high_pulse_widths([(0xFFFFFFF0, 1), (0x00000036, 0)]) == [0x46]
+
+
+def test_response_pulse_ignored():
+    """释放总线和80us响应的高电平宽度合理，但不在最后40个数据位中，不影响解码"""
+    widths = high_pulse_widths(trace(encode(55, 23)))
+    assert widths[:2] == [30, 80]
+    assert len(widths) == 42
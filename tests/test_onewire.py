@@ -0,0 +1,121 @@
+"""
+1-Wire DS18B20读取测试（用临时目录模拟sysfs）
+"""
+
+import builtins
+
+import pytest
+
+import onewire
+from onewire import OneWireBus, parse_w1_slave
+
+PROBE_A = "28-00000a1b2c3d"
+PROBE_B = "28-00000e4f5a6b"
+
+
+def w1_slave(millicelsius, crc="YES"):
+    return (f"72 01 4b 46 7f ff 0e 10 57 : crc=57 {crc}\n"
+            f"72 01 4b 46 7f ff 0e 10 57 t={millicelsius}\n")
+
+
+def add_probe(root, probe, millicelsius, temperature=True):
+    probe_dir = root / probe
+    probe_dir.mkdir()
+    (probe_dir / "w1_slave").write_text(w1_slave(millicelsius))
+    if temperature:
+        (probe_dir / "temperature").write_text(f"{millicelsius}\n")
+    return probe_dir
+
+
+@pytest.fixture
+def sysfs(tmp_path):
+    (tmp_path / "w1_bus_master1").mkdir()
+    add_probe(tmp_path, PROBE_A, 21375)
+    add_probe(tmp_path, PROBE_B, -1250)
+    return tmp_path
+
+
+@pytest.fixture
+def bulk_read(sysfs, monkeypatch):
+    """模拟内核的therm_bulk_read: 写入trigger后读到-1，轮询等待几次后变为1"""
+    path = sysfs / "w1_bus_master1" / "therm_bulk_read"
+    path.write_text("0\n")
+    state = {"triggers": 0, "polls": 0}
+    real_open = builtins.open
+
+    class Trigger:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def write(self, text):
+            assert text.strip() == "trigger"
+            state["triggers"] += 1
+            path.write_text("-1\n")
+
+    def fake_open(file, mode="r", *args, **kwargs):
+        if str(file) == str(path) and "w" in mode:
+            return Trigger()
+        return real_open(file, mode, *args, **kwargs)
+
+    def fake_sleep(seconds):
+        state["polls"] += 1
+        if state["polls"] >= state.get("converting_polls", 2):
+            path.write_text("1\n")
+
+    monkeypatch.setattr(onewire, "open", fake_open, raising=False)
+    monkeypatch.setattr(onewire.time, "sleep", fake_sleep)
+    return state
+
+
+def test_probe_discovery(sysfs):
+    (sysfs / "10-000801b5a4f2").mkdir()  # DS18S20等其他家族忽略
+    assert OneWireBus(root=sysfs).probes() == [PROBE_A, PROBE_B]
+    assert OneWireBus(root=sysfs / "missing").read_all() == {}
+
+
+def test_individual_read_without_bulk_support(sysfs):
+    temperatures = OneWireBus(root=sysfs).read_all()
+    assert temperatures == {PROBE_A: 21.375, PROBE_B: -1.25}
+
+
+def test_bulk_read_waits_while_converting(sysfs, bulk_read):
+    """批量转换读到-1时继续轮询，完成后读取temperature属性"""
+    # w1_slave与temperature不同，用来区分读取路径
+    (sysfs / PROBE_A / "w1_slave").write_text(w1_slave(99000))
+    temperatures = OneWireBus(root=sysfs).read_all()
+
+    assert bulk_read["triggers"] == 1
+    assert bulk_read["polls"] == 2
+    assert temperatures == {PROBE_A: 21.375, PROBE_B: -1.25}
+
+
+def test_bulk_read_timeout_falls_back_to_w1_slave(sysfs, bulk_read):
+    bulk_read["converting_polls"] = float("inf")
+    (sysfs / PROBE_A / "temperature").write_text("99000\n")
+    temperatures = OneWireBus(root=sysfs, conversion_timeout=0).read_all()
+    assert temperatures[PROBE_A] == 21.375
+
+
+def test_crc_failure_and_power_on_value_rejected(sysfs):
+    (sysfs / PROBE_A / "w1_slave").write_text(w1_slave(21375, crc="NO"))
+    (sysfs / PROBE_B / "w1_slave").write_text(w1_slave(85000))
+    assert OneWireBus(root=sysfs).read_all() == {PROBE_A: None, PROBE_B: None}
+    assert parse_w1_slave("") is None
+
+
+def test_power_on_value_rejected_after_bulk_read(sysfs, bulk_read):
+    (sysfs / PROBE_B / "temperature").write_text("85000\n")
+    assert OneWireBus(root=sysfs).read_all() == {PROBE_A: 21.375, PROBE_B: None}
+
+
+def test_missing_probe_reads_none(sysfs):
+    """探头在扫描后被拔出时该探头为None，其他探头正常"""
+    bus = OneWireBus(root=sysfs)
+    probes = bus.probes()
+    (sysfs / PROBE_B / "w1_slave").unlink()
+    (sysfs / PROBE_B / "temperature").unlink()
+    bus.probes = lambda: probes
+    assert bus.read_all() == {PROBE_A: 21.375, PROBE_B: None}
@@ -0,0 +1,142 @@
+"""
+PWM后端测试
+"""
+
+import sys
+import types
+
+import pytest
+
+import pwm
+from config import SYSTEM_CONFIG
+
+
+class RecordingPWM:
+    """代替RPi.GPIO软件PWM，记录回退"""
+
+    def __init__(self, pin, frequency):
+        self.pin = pin
+        self.frequency = frequency
+
+
+class FakePi:
+    def __init__(self, connected=True):
+        self.connected = connected
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name,) + args)
+
+
+@pytest.fixture(autouse=True)
+def software_fallback(monkeypatch):
+    monkeypatch.setattr(pwm, "RPiGPIOPWM", RecordingPWM)
+
+
+@pytest.fixture
+def fake_pigpio(monkeypatch):
+    module = types.SimpleNamespace(OUTPUT=1, connected=True)
+    module.pi = lambda: FakePi(module.connected)
+    monkeypatch.setitem(sys.modules, "pigpio", module)
+    return module
+
+
+@pytest.fixture
+def sysfs_root(tmp_path, monkeypatch):
+    channel_dir = tmp_path / "pwmchip0" / "pwm0"
+    channel_dir.mkdir(parents=True)
+    for name in ("period", "duty_cycle", "enable"):
+        (channel_dir / name).write_text("0\n")
+    monkeypatch.setattr(pwm, "SYSFS_PWM_DIR", str(tmp_path))
+    return channel_dir
+
+
+def test_fake_pwm_records_duty_cycles():
+    output = pwm.create_pwm(12, 50, backend="fake")
+    assert isinstance(output, pwm.FakePWM)
+
+    output.start(5)
+    output.ChangeDutyCycle(7.5)
+    output.stop()
+
+    assert [duty for _, duty in output.history] == [5, 7.5]
+    assert output.duty == 7.5
+    assert not output.running
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        pwm.create_pwm(12, 50, backend="pwm9000")
+
+
+def test_backend_defaults_to_config(monkeypatch):
+    monkeypatch.setitem(SYSTEM_CONFIG, "PWM_BACKEND", "fake")
+    assert isinstance(pwm.create_pwm(12, 50), pwm.FakePWM)
+
+
+def test_pigpio_hardware_channel_then_dma(fake_pigpio):
+    """同一硬件通道的第二个引脚改用DMA定时PWM"""
+    first = pwm.create_pwm(12, 100, backend="pigpio")
+    second = pwm.create_pwm(18, 100, backend="pigpio")
+    try:
+        assert first.hardware and not second.hardware
+
+        first.ChangeDutyCycle(25)
+        second.ChangeDutyCycle(25)
+        assert ("hardware_PWM", 12, 100, 250000) in first.pi.calls
+        assert ("set_PWM_dutycycle", 18, 250) in second.pi.calls
+    finally:
+        first.stop()
+        second.stop()
+
+
+def test_pigpio_dma_servo_uses_pulse_width(fake_pigpio):
+    """DMA定时的舵机按微秒脉宽输出，不受占空比范围限制"""
+    holder = pwm.create_pwm(12, 100, backend="pigpio")
+    servo = pwm.create_pwm(18, 50, backend="pigpio", servo=True)
+    try:
+        assert not servo.hardware
+        servo.ChangeDutyCycle(7.5)
+        servo.ChangeDutyCycle(7.55)
+        assert ("set_servo_pulsewidth", 18, 1500) in servo.pi.calls
+        assert ("set_servo_pulsewidth", 18, 1510) in servo.pi.calls
+        assert not any(call[0] == "set_PWM_range" for call in servo.pi.calls)
+    finally:
+        servo.stop()
+        holder.stop()
+    assert servo.pi.calls[-1] == ("set_servo_pulsewidth", 18, 0)
+
+
+def test_pigpio_unavailable_falls_back(fake_pigpio):
+    fake_pigpio.connected = False
+    output = pwm.create_pwm(12, 100, backend="pigpio")
+    assert isinstance(output, RecordingPWM)
+
+
+def test_sysfs_backend_writes_channel(sysfs_root, monkeypatch):
+    monkeypatch.setitem(SYSTEM_CONFIG, "PWM_SYSFS_CHANNELS", {12: (0, 0)})
+    output = pwm.create_pwm(12, 50, backend="sysfs")
+    try:
+        assert isinstance(output, pwm.SysfsPWM)
+        output.start(10)
+        assert (sysfs_root / "period").read_text() == "20000000\n"
+        assert (sysfs_root / "duty_cycle").read_text() == "2000000\n"
+        assert (sysfs_root / "enable").read_text() == "1\n"
+    finally:
+        output.stop()
+    assert (sysfs_root / "enable").read_text() == "0\n"
+
+
+def test_sysfs_shared_or_unmapped_channel_falls_back(sysfs_root, monkeypatch):
+    """未配置的引脚和已被占用的通道都退回软件PWM"""
+    monkeypatch.setitem(SYSTEM_CONFIG, "PWM_SYSFS_CHANNELS", {12: (0, 0), 18: (0, 0)})
+    first = pwm.create_pwm(12, 50, backend="sysfs")
+    try:
+        assert isinstance(pwm.create_pwm(18, 50, backend="sysfs"), RecordingPWM)
+        assert isinstance(pwm.create_pwm(13, 50, backend="sysfs"), RecordingPWM)
+    finally:
+        first.stop()
+    # 释放后可以重新使用该通道
+    again = pwm.create_pwm(18, 50, backend="sysfs")
+    assert isinstance(again, pwm.SysfsPWM)
+    again.stop()
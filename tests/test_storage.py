@@ -0,0 +1,68 @@
+"""
+数据库写入线程测试
+"""
+
+import sqlite3
+import threading
+import time
+
+from storage import DatabaseWriter
+
+
+def make_row(i):
+    ts_ms = 1700000000000 + i * 1000
+    return (ts_ms, f"2023-11-14T22:13:{i % 60:02d}", 20.0, 50.0, 30.0, 18.0, 100.0)
+
+
+def count_rows(db_file):
+    conn = sqlite3.connect(db_file)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM sensor_data").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_stop_commits_pending_rows(tmp_path):
+    """stop()前提交的数据在停止后都已写入数据库，且不必等到提交间隔结束"""
+    db_file = str(tmp_path / "greenhouse.db")
+    writer = DatabaseWriter(db_file=db_file, batch_size=50, commit_interval=30)
+    writer.start()
+    for i in range(3):
+        writer.submit(make_row(i))
+
+    started = time.monotonic()
+    writer.stop()
+
+    assert time.monotonic() - started < 5.0
+    assert not writer.writer_thread.is_alive()
+    assert count_rows(db_file) == 3
+
+
+def test_flush_survives_full_queue(tmp_path):
+    """队列满时丢弃最旧数据，不会丢弃正在等待的flush请求"""
+    db_file = str(tmp_path / "greenhouse.db")
+    writer = DatabaseWriter(db_file=db_file, queue_size=5, batch_size=3, commit_interval=30)
+    writer.start()
+
+    commit = writer._commit
+
+    def slow_commit(pending):
+        time.sleep(0.2)
+        return commit(pending)
+
+    writer._commit = slow_commit
+    for i in range(3):
+        writer.submit(make_row(i))
+    time.sleep(0.05)
+
+    result = {}
+    flusher = threading.Thread(target=lambda: result.setdefault("flushed", writer.flush(5.0)))
+    flusher.start()
+    for i in range(3, 40):
+        writer.submit(make_row(i))
+    flusher.join()
+
+    assert result["flushed"] is True
+    assert writer.dropped_rows > 0
+    writer.stop()
+    assert count_rows(db_file) == 40 - writer.dropped_rows
@@ -10,11 +10,24 @@ from flask import Flask, render_template, jsonify, request, Response
 import json
 import os
 import io
+import csv
+import hashlib
+from collections import OrderedDict
 from flask.helpers import send_from_directory
 import socket
-from flask_socketio import SocketIO
+import queue
+from flask_socketio import SocketIO, emit
+try:
+    import eventlet
+    import eventlet.event
+    from eventlet import tpool
+except ImportError:
+    eventlet = None
 # 导入配置文件 - 修复导入错误
 from config import SYSTEM_CONFIG, THRESHOLD_CONFIG
+from logsetup import setup_logging
+from storage import HISTORY_RESOLUTIONS, SENSOR_FIELDS, to_epoch_ms
+from eventbus import bus, ACTUATOR_CHANGE, COALESCE, COMMAND_RECEIVED
 
 
 
@@ -24,17 +37,88 @@ from config import SYSTEM_CONFIG, THRESHOLD_CONFIG
 
 
 # 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(SYSTEM_CONFIG["LOG_FILE"]),
-        logging.StreamHandler()
-    ]
-)
+setup_logging()
 
 logger = logging.getLogger("WebServer")
 
+# 迭代结束标记
+_END = object()
+
+# 计算增量时忽略的字段：system_time随增量消息单独发送，
+# statistics每次推送都会变化，按WEB_STATS_INTERVAL单独发送
+DELTA_IGNORED_KEYS = ("system_time", "version", "statistics")
+# 子字典中不单独构成变化的键（只随其他变化的子键一起发送）
+DELTA_PASSIVE_SUBKEYS = ("timestamp",)
+
+
+def status_delta(old, new):
+    """计算两次推送状态之间变化的字段
+
+    字典按两层比较：同为字典的字段只包含变化的子键，其他字段变化时整体替换。
+    状态的字段结构是固定的，不处理字段被删除的情况。
+    """
+    changes = {}
+    for key, value in new.items():
+        if key in DELTA_IGNORED_KEYS:
+            continue
+        before = old.get(key)
+        if isinstance(value, dict) and isinstance(before, dict):
+            sub = {k: v for k, v in value.items()
+                   if k not in DELTA_PASSIVE_SUBKEYS and (k not in before or before[k] != v)}
+            if sub:
+                for k in DELTA_PASSIVE_SUBKEYS:
+                    if k in value:
+                        sub[k] = value[k]
+                changes[key] = sub
+        elif before != value:
+            changes[key] = value
+    return changes
+
+
+class GreenFrameRelay:
+    """eventlet模式下把摄像头帧转交给协程中的观看者
+
+    只有一个协程通过tpool在原生线程中等待FrameBroadcaster的新帧，
+    收到后保存共享的MJPEG分段并唤醒所有观看者；观看者在eventlet事件上等待，
+    不会阻塞事件循环，也不会为每个观看者占用一个线程。
+    """
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.seq = 0
+        self.chunk = None
+        self.event = eventlet.event.Event()
+        self.running = False
+
+    def run(self):
+        """转发循环（在服务器的事件循环中作为后台任务运行）"""
+        self.running = True
+        while self.running:
+            try:
+                seq, chunk = tpool.execute(self.frames.wait_for_chunk, self.seq, 1.0)
+            except Exception as e:
+                logger.error(f"转发视频帧错误: {e}")
+                eventlet.sleep(0.5)
+                continue
+            if chunk is None:
+                continue
+            self.seq, self.chunk = seq, chunk
+            event, self.event = self.event, eventlet.event.Event()
+            event.send()
+
+    def wait_for_chunk(self, after_seq, timeout=None):
+        """等待序号大于after_seq的帧，接口与FrameBroadcaster.wait_for_chunk相同"""
+        if self.seq <= after_seq:
+            with eventlet.Timeout(timeout, False):
+                self.event.wait()
+        if self.seq > after_seq:
+            return self.seq, self.chunk
+        return after_seq, None
+
+    def stop(self):
+        self.running = False
+
+
 class WebServer:
     """Web服务器类"""
     
@@ -56,8 +140,31 @@ class WebServer:
         #尝试解决乱码
         self.app.config['JSON_AS_ASCII'] = False
         self.app.config['JSONIFY_MIMETYPE'] = 'application/json; charset=utf-8'  # 添加这行
+        # 服务器模式: eventlet(协程事件循环，用于长期运行) / threading(Werkzeug开发服务器)
+        self.server_mode = SYSTEM_CONFIG.get("WEB_SERVER_MODE", "eventlet")
+        if self.server_mode == "eventlet" and eventlet is None:
+            logger.warning("未安装eventlet，Web服务器改用threading模式")
+            self.server_mode = "threading"
+        
         # 添加SocketIO支持 - 注意位置在创建Flask应用之后
-        self.socketio = SocketIO(self.app, cors_allowed_origins="*", async_mode='threading')
+        self.socketio = SocketIO(self.app, cors_allowed_origins="*", async_mode=self.server_mode)
+        
+        # eventlet模式下视频观看者通过协程转发器等待新帧
+        self.frame_relay = None
+        if self.server_mode == "eventlet" and self.camera_module is not None:
+            self.frame_relay = GreenFrameRelay(self.camera_module.frames)
+        
+        # 序列化后的API响应缓存: 缓存键 -> (ETag, JSON字节)（LRU）
+        self.response_cache = OrderedDict()
+        self.response_cache_lock = threading.Lock()
+        # 每个进程不同的随机数，重启后客户端和代理持有的旧ETag全部失效
+        self.etag_nonce = os.urandom(8)
+        
+        # 最近一次推送的状态及其版本号，增量推送以此为基准
+        self.status_lock = threading.Lock()
+        self.status = None
+        self.status_version = 0
+        self.stats_pushed_at = 0
         
         # 设置路由
         self._setup_routes()
@@ -70,6 +177,9 @@ class WebServer:
         
         # 服务器线程
         self.server_thread = None
+        self.push_thread = None
+        self.push_subscription = None
+        self.loop_stopped = threading.Event()
         self.running = False
         
         logger.info("Web服务器初始化完成")
@@ -100,24 +210,81 @@ class WebServer:
         
         @self.app.route('/api/data/current')
         def current_data():
-            """获取当前传感器数据"""
-            sensor_data = self.sensor_module.get_latest_readings()
-            controller_status = self.controller_module.get_status()
+            """获取当前传感器数据
             
-            response = {
-                "sensor_data": sensor_data,
-                "controller_status": controller_status,
-                "system_time": datetime.now().isoformat()
-            }
+            返回最近一次记录的读数（按READING_INTERVAL更新）、各土壤温度探头的读数和ADC各通道电压，
+            按快照序号、探头读数、电压和控制器状态缓存，未变化时返回304。
+            服务器时间不放在缓存的响应体中，每次由X-System-Time响应头返回。
+            """
+            def gather():
+                return (self.sensor_module.get_recorded_readings(),
+                        self.sensor_module.get_soil_temperatures(),
+                        self.sensor_module.get_adc_voltages(),
+                        self.controller_module.get_status())
+            
+            # 读取过程会获取传感器和控制器的原生锁
+            sensor_data, soil_temperatures, adc_voltages, controller_status = self._offload(gather)
             
-            return jsonify(response)
+            def build():
+                return {
+                    "sensor_data": sensor_data,
+                    "soil_temperatures": soil_temperatures,
+                    "adc_voltages": adc_voltages,
+                    "controller_status": controller_status,
+                }
+            
+            key = ("current", sensor_data.seq, repr(soil_temperatures), repr(adc_voltages),
+                   repr(controller_status))
+            response = self._cached_json(key, build)
+            response.headers['X-System-Time'] = datetime.now().isoformat()
+            return response
         
         @self.app.route('/api/data/history')
         def history_data():
             """获取历史数据"""
             hours = request.args.get('hours', default=24, type=int)
-            data = self.sensor_module.get_historical_data(hours)
-            return jsonify(data)
+            # raw/1m/1h/1d，默认auto按时间范围选择最合适的汇总级别
+            resolution = request.args.get('resolution', default='auto')
+            if resolution != 'auto' and resolution not in HISTORY_RESOLUTIONS:
+                return jsonify({"success": False, "error": f"不支持的历史数据分辨率: {resolution}"}), 400
+            # 可选保留的小数位数
+            precision = request.args.get('precision', default=None, type=int)
+            
+            # format=columns 返回列式数据: timestamp及每个字段各一个数组
+            columns = request.args.get('format') == 'columns'
+            
+            def build():
+                return self._offload(self.sensor_module.query_historical, hours, resolution, precision, columns)
+            
+            # 查询参数和数据版本都不变时直接使用缓存，不再查询SQLite；查询失败不缓存
+            version = self.sensor_module.get_history_version(hours, resolution)
+            try:
+                return self._cached_json(("history", hours, resolution, precision, columns, version), build)
+            except Exception as e:
+                logger.error(f"获取历史数据失败: {e}")
+                return jsonify({"success": False, "error": str(e)}), 500
+        
+        @self.app.route('/api/data/export')
+        def export_data():
+            """流式导出任意时间范围的原始数据 (NDJSON/CSV)"""
+            fmt = request.args.get('format', default='ndjson').lower()
+            if fmt not in ('ndjson', 'csv'):
+                return jsonify({"success": False, "error": f"不支持的导出格式: {fmt}"}), 400
+            
+            try:
+                start_ms, end_ms = self._parse_time_range(request.args)
+            except ValueError as e:
+                return jsonify({"success": False, "error": str(e)}), 400
+            
+            chunks = self._offload_iter(self.sensor_module.iter_historical_data(start_ms, end_ms))
+            if fmt == 'csv':
+                body, content_type = self._csv_stream(chunks), 'text/csv; charset=utf-8'
+            else:
+                body, content_type = self._ndjson_stream(chunks), 'application/x-ndjson; charset=utf-8'
+            
+            filename = f"greenhouse_{datetime.fromtimestamp(start_ms / 1000):%Y%m%d%H%M}.{fmt}"
+            return Response(body, content_type=content_type,
+                            headers={"Content-Disposition": f"attachment; filename={filename}"})
         
         @self.app.route('/api/control', methods=['POST'])
         def control_device():
@@ -128,7 +295,8 @@ class WebServer:
                 action = data.get('action')
                 value = data.get('value')
                 
-                result = self.controller_module.manual_control(device, action, value)
+                result = self._control('control', data, self.controller_module.manual_control,
+                                       device, action, value)
                 
                 return jsonify({"success": result})
             
@@ -136,6 +304,15 @@ class WebServer:
                 logger.error(f"控制设备API错误: {e}")
                 return jsonify({"success": False, "error": str(e)})
         
+        @self.app.route('/api/control/stats')
+        def get_control_stats():
+            """获取控制决策统计（评估次数、看门狗触发次数、决策延迟）"""
+            try:
+                return jsonify({"success": True, "data": self._offload(self.controller_module.get_control_stats)})
+            except Exception as e:
+                logger.error(f"获取控制统计API错误: {e}")
+                return jsonify({"success": False, "error": str(e)})
+        
         @self.app.route('/api/auto_mode', methods=['POST'])
         def set_auto_mode():
             """设置自动/手动模式"""
@@ -143,7 +320,7 @@ class WebServer:
                 data = request.get_json()
                 auto_mode = data.get('auto_mode', True)
                 
-                self.controller_module.set_auto_mode(auto_mode)
+                self._control('auto_mode', data, self.controller_module.set_auto_mode, auto_mode)
                 
                 return jsonify({"success": True})
             
@@ -166,32 +343,188 @@ class WebServer:
             return Response(self._generate_video_frames(),
                            mimetype='multipart/x-mixed-replace; boundary=frame')
     
+    def _parse_time_range(self, args):
+        """解析导出时间范围参数
+        
+        start/end 可为毫秒时间戳或ISO时间字符串；未给出start时使用hours(默认24)。
+        
+        Returns:
+            (start_ms, end_ms): end_ms为None表示到最新
+        """
+        def parse(value):
+            if value is None or value == '':
+                return None
+            try:
+                return int(value)
+            except ValueError:
+                pass
+            try:
+                return to_epoch_ms(datetime.fromisoformat(value))
+            except ValueError:
+                raise ValueError(f"无效的时间参数: {value}")
+        
+        end_ms = parse(args.get('end'))
+        start_ms = parse(args.get('start'))
+        if start_ms is None:
+            hours = args.get('hours', default=24, type=float)
+            start_ms = (end_ms or to_epoch_ms()) - int(hours * 3600 * 1000)
+        if end_ms is not None and end_ms <= start_ms:
+            raise ValueError("结束时间必须晚于开始时间")
+        return start_ms, end_ms
+    
+    def _cached_json(self, key, build):
+        """返回带强ETag的JSON响应，相同key的响应体只生成一次
+        
+        Args:
+            key: 缓存键，包含决定响应内容的全部参数和数据版本
+            build: 生成响应数据的函数，只在缓存未命中时调用；抛出的异常不缓存，由调用方处理
+        
+        ETag是进程随机数加响应体的哈希，响应体不同时ETag一定不同。
+        If-None-Match与ETag一致时返回304，缓存命中时不生成响应体。
+        """
+        with self.response_cache_lock:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                self.response_cache.move_to_end(key)
+        if cached is None:
+            body = self.app.json.dumps(build()).encode('utf-8')
+            cached = (hashlib.sha1(self.etag_nonce + body).hexdigest()[:24], body)
+            with self.response_cache_lock:
+                self.response_cache[key] = cached
+                while len(self.response_cache) > SYSTEM_CONFIG.get("WEB_RESPONSE_CACHE_SIZE", 16):
+                    self.response_cache.popitem(last=False)
+        
+        etag, body = cached
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, content_type='application/json; charset=utf-8')
+        
+        response.set_etag(etag)
+        # 允许客户端和反向代理缓存，但每次使用前都要重新验证
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    
+    def _offload(self, func, *args):
+        """执行可能阻塞的调用（数据库查询等）
+        
+        eventlet模式下放到tpool原生线程中执行，事件循环在等待期间继续处理其他连接；
+        threading模式下直接调用。
+        """
+        if self.server_mode == "eventlet":
+            return tpool.execute(func, *args)
+        return func(*args)
+    
+    def _offload_iter(self, iterable):
+        """在独立的原生线程中迭代（数据库游标只能在创建它的线程中使用）
+        
+        eventlet模式下生产线程把元素放入有界队列，协程通过tpool逐个取出；
+        threading模式下原样返回。
+        """
+        if self.server_mode != "eventlet":
+            return iterable
+        
+        items = queue.Queue(maxsize=2)
+        stopped = threading.Event()
+        
+        def produce():
+            try:
+                for item in iterable:
+                    while not stopped.is_set():
+                        try:
+                            items.put(item, timeout=1.0)
+                            break
+                        except queue.Full:
+                            pass
+                    if stopped.is_set():
+                        return
+            except Exception as e:
+                logger.error(f"迭代数据时出错: {e}")
+            finally:
+                # 结束标记必须送达，否则消费方会一直等待；消费方停止后才放弃
+                while not stopped.is_set():
+                    try:
+                        items.put(_END, timeout=1.0)
+                        break
+                    except queue.Full:
+                        pass
+        
+        def get_item():
+            # 限时等待，生产线程意外退出时不会永久占用tpool线程
+            while True:
+                try:
+                    return items.get(timeout=1.0)
+                except queue.Empty:
+                    if not producer.is_alive() and items.empty():
+                        return _END
+        
+        def consume():
+            try:
+                while True:
+                    item = tpool.execute(get_item)
+                    if item is _END:
+                        return
+                    yield item
+            finally:
+                stopped.set()
+        
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        return consume()
+    
+    def _ndjson_stream(self, chunks):
+        """按块生成NDJSON，每行一条记录"""
+        keys = ("ts_ms", "timestamp") + SENSOR_FIELDS
+        for rows in chunks:
+            yield ''.join(json.dumps(dict(zip(keys, row)), ensure_ascii=False) + '\n' for row in rows)
+    
+    def _csv_stream(self, chunks):
+        """按块生成CSV，首块包含表头"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(("ts_ms", "timestamp") + SENSOR_FIELDS)
+        for rows in chunks:
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    
     def _generate_video_frames(self):
-        """生成视频帧"""
+        """生成视频帧
+        
+        等待摄像头广播的下一帧，只发送新帧；发送慢于帧率时跳过中间的旧帧。
+        """
         if not self.camera_module:
             return
             
+        # eventlet模式下在协程转发器上等待，不阻塞事件循环
+        frames = self.frame_relay or self.camera_module.frames
+        seq = 0
         while self.running:
             try:
-                # 获取当前帧
-                frame_data = self.camera_module.get_frame()
-                if frame_data:
-                    yield (b'--frame\r\n'
-                          b'Content-Type: image/jpeg\r\n\r\n' + frame_data + b'\r\n')
-                
-                # 控制帧率
-                time.sleep(1.0 / SYSTEM_CONFIG["CAMERA_FRAMERATE"])
+                # 等待新帧，超时后重新检查运行状态
+                seq, chunk = frames.wait_for_chunk(seq, timeout=1.0)
+                if chunk is not None:
+                    yield chunk
             except Exception as e:
                 logger.error(f"生成视频帧错误: {e}")
-                time.sleep(0.5)  # 出错后暂停一下
+                self.socketio.sleep(0.5)  # 出错后暂停一下
 
     def _setup_socketio(self):
         """设置Socket.IO事件处理"""
         @self.socketio.on('connect')
         def handle_connect():
             logger.info('客户端已连接')
-            # 连接后立即发送一次当前状态
-            self._push_sensor_data()
+            # 连接后立即只给新客户端发送一次完整状态
+            emit('status_update', self._offload(self._status_snapshot))
+        
+        @self.socketio.on('request_resync')
+        def handle_request_resync(data=None):
+            # 客户端发现版本号不连续时请求完整快照
+            logger.debug('客户端请求重新同步状态')
+            emit('status_update', self._offload(self._status_snapshot))
         
         @self.socketio.on('disconnect')
         def handle_disconnect():
@@ -201,49 +534,45 @@ class WebServer:
         def handle_control_mode(data):
             auto_mode = data.get('auto_mode', True)
             logger.info(f'收到模式控制请求: {"自动" if auto_mode else "手动"}模式')
-            self.controller_module.set_auto_mode(auto_mode)
-            # 发送状态更新
-            self._push_sensor_data()
+            # 发布命令事件，由推送线程合并后广播状态更新
+            self._control('control_mode', data, self.controller_module.set_auto_mode, auto_mode)
             
         @self.socketio.on('control_fan')
         def handle_control_fan(data):
             state = data.get('state', False)
             logger.info(f'收到风扇控制请求: {"开启" if state else "关闭"}')
-            self.controller_module.manual_control('fan', 'set', state)
-            # 发送状态更新
-            self._push_sensor_data()
+            # 发布命令事件，由推送线程合并后广播状态更新
+            self._control('control_fan', data, self.controller_module.manual_control, 'fan', 'set', state)
             
         @self.socketio.on('control_pump')
         def handle_control_pump(data):
             state = data.get('state', False)
             logger.info(f'收到水泵控制请求: {"开启" if state else "关闭"}')
-            self.controller_module.manual_control('pump', 'set', state)
-            # 发送状态更新
-            self._push_sensor_data()
+            # 发布命令事件，由推送线程合并后广播状态更新
+            self._control('control_pump', data, self.controller_module.manual_control, 'pump', 'set', state)
             
         @self.socketio.on('control_light')
         def handle_control_light(data):
             state = data.get('state', False)
             logger.info(f'收到灯光控制请求: {"开启" if state else "关闭"}')
-            self.controller_module.manual_control('light', 'set', state)
-            # 发送状态更新
-            self._push_sensor_data()
+            # 发布命令事件，由推送线程合并后广播状态更新
+            self._control('control_light', data, self.controller_module.manual_control, 'light', 'set', state)
             
         @self.socketio.on('control_stepper')
         def handle_control_stepper(data):
             position = data.get('position', 0)
             logger.info(f'收到窗口控制请求: {position}%开度')
-            self.controller_module.manual_control('stepper', 'set', position)
-            # 发送状态更新
-            self._push_sensor_data()
+            # 发布命令事件，由推送线程合并后广播状态更新
+            self._control('control_stepper', data,
+                          self.controller_module.manual_control, 'stepper', 'set', position)
             
         @self.socketio.on('update_thresholds')
         def handle_update_thresholds(data):
             logger.info(f'收到阈值更新请求: {data}')
             # 这里需要实现阈值更新的逻辑
             # 可能需要添加到controller_module中
-            # 发送状态更新
-            self._push_sensor_data()
+            # 发布命令事件，由推送线程合并后广播状态更新
+            self._offload(self._publish_command, 'update_thresholds', data)
         @self.socketio.on('control_stepper')
         def handle_control_stepper(data):
             #处理窗口开度控制（映射为舵机控制）
@@ -252,26 +581,19 @@ class WebServer:
             # 将0-100%的开度值映射为0-180°的舵机角度
             angle = int(position * 1.8)
             # 调用控制器的舵机控制函数
-            self.controller_module.manual_control('servo', 'set', angle)
-            # 发送状态更新
-            self._push_sensor_data()
+            # 发布命令事件，由推送线程合并后广播状态更新
+            self._control('control_stepper', data, self.controller_module.manual_control, 'servo', 'set', angle)
             
             
             
             
 
-    def _push_sensor_data(self):
-     try:
-        # 获取最新数据
+    def _build_status(self):
+        """构建与前端期望完全一致的状态数据结构"""
         sensor_data = self.sensor_module.get_latest_readings()
         controller_status = self.controller_module.get_status()
         
-        # 记录原始数据，以便调试
-        #logger.info(f"原始传感器数据: {sensor_data}")
-        #logger.info(f"原始控制器状态: {controller_status}")
-        
-        # 构建与前端期望完全一致的数据结构
-        data = {
+        return {
             "sensors": sensor_data,
             "devices": {
                 "fan": controller_status.get("fan_status", False),
@@ -280,6 +602,8 @@ class WebServer:
                 "stepper": controller_status.get("servo_angle", 90) / 180 * 100  # 转换为百分比
             },
             "auto_mode": controller_status.get("auto_mode", True),
+            "soil_temperatures": self.sensor_module.get_soil_temperatures(),
+            "statistics": self.sensor_module.get_statistics(precision=2),
             "system_time": datetime.now().isoformat(),
             "thresholds": {
                 "temp_min": THRESHOLD_CONFIG["TEMP_MIN"],
@@ -292,34 +616,153 @@ class WebServer:
                 "light_max": THRESHOLD_CONFIG["LIGHT_MAX"]
             }
         }
+    
+    def _status_snapshot(self):
+        """当前状态的完整快照（带版本号），用于新连接和重新同步"""
+        with self.status_lock:
+            if self.status is None:
+                self.status = self._build_status()
+                self.status_version += 1
+            return dict(self.status, version=self.status_version)
+    
+    def _push_sensor_data(self):
+        """向所有客户端推送状态
+        
+        增量模式(WEB_PUSH_DELTA)下只发送变化的字段(status_delta)，没有变化时不发送；
+        statistics每隔WEB_STATS_INTERVAL才随增量发送一次。
+        每次发送版本号加1，客户端发现base与本地版本不一致时发送request_resync。
+        """
+        try:
+            # 构建状态会获取传感器和控制器的原生锁，在tpool中执行；
+            # 只有推送循环调用本方法，释放status_lock后再发送不会打乱版本顺序
+            message = self._offload(self._prepare_push)
+            if message is None:
+                return
+            self.socketio.emit(*message)
+            logger.debug('状态数据已推送到客户端')
+        except Exception as e:
+            logger.error(f'推送数据时发生错误: {e}')
+    
+    def _prepare_push(self):
+        """更新基准状态并生成要推送的消息
         
-        # 记录发送的数据
-        #logger.info(f"推送数据到客户端: {data}")
+        Returns:
+            (事件名, 数据)，增量模式下没有变化时返回None
+        """
+        data = self._build_status()
         
-        # 发送到客户端
-        self.socketio.emit('status_update', data)
-        logger.info('状态数据已推送到客户端')
-     except Exception as e:
-        logger.error(f'推送数据时发生错误: {e}')
+        with self.status_lock:
+            previous = self.status
+            if not SYSTEM_CONFIG.get("WEB_PUSH_DELTA", True) or previous is None:
+                self.status = data
+                self.status_version += 1
+                return 'status_update', dict(data, version=self.status_version)
+            
+            changes = status_delta(previous, data)
+            now = time.monotonic()
+            if now - self.stats_pushed_at >= SYSTEM_CONFIG.get("WEB_STATS_INTERVAL", 30.0):
+                changes["statistics"] = data["statistics"]
+                self.stats_pushed_at = now
+            # 忽略的字段也更新到基准状态，新客户端的完整快照使用最新值
+            self.status = data
+            if not changes:
+                return None
+            self.status_version += 1
+            return 'status_delta', {
+                "version": self.status_version,
+                "base": self.status_version - 1,
+                "changes": changes,
+                "system_time": data["system_time"],
+            }
+
+    def _publish_command(self, command, data):
+        """把已执行的控制命令发布到事件总线（同时触发一次合并的状态推送）"""
+        bus.publish(COMMAND_RECEIVED, {"source": "web", "command": command, "data": data})
+    
+    def _control(self, command, data, func, *args):
+        """执行控制命令并发布命令事件
+        
+        控制器方法会获取原生锁并操作GPIO/PWM，通过_offload执行，
+        eventlet模式下等待期间事件循环继续处理其他连接。
         
+        Returns:
+            控制器方法的返回值
+        """
+        def run():
+            result = func(*args)
+            self._publish_command(command, data)
+            return result
         
+        return self._offload(run)
 
     def _data_push_loop(self):
-        """定时推送数据的循环"""
-        while self.running:
-            self._push_sensor_data()
-            time.sleep(3)  # 每3秒更新一次
+        """推送循环：读数按WEB_PUSH_INTERVAL定时推送，执行器状态变化或控制命令时立即推送
+
+        所有推送都在本循环中进行，控制命令的处理函数只发布事件后立即返回。
+        eventlet模式下作为服务器事件循环中的后台任务运行，等待事件时不阻塞事件循环。
+        不订阅SENSOR_SAMPLE：adc任务每0.1秒发布一次读数，按读数唤醒会让推送频率
+        退化为WEB_PUSH_MIN_INTERVAL。订阅队列按类型合并：执行器变化至少间隔
+        WEB_PUSH_MIN_INTERVAL推送一次；控制命令只等待WEB_PUSH_COALESCE_WINDOW，
+        把拖动滑块等连续命令合并为一次推送（增量模式下状态没有变化时不发送）。
+        """
+        subscription = bus.subscribe(
+            "webserver", [ACTUATOR_CHANGE, COMMAND_RECEIVED], maxsize=2, policy=COALESCE
+        )
+        # stop()关闭订阅以唤醒等待中的get
+        self.push_subscription = subscription
+        last_push = 0
+        try:
+            while self.running:
+                event = self._offload(subscription.get, SYSTEM_CONFIG["WEB_PUSH_INTERVAL"])
+                
+                # 未到最短推送间隔时继续等待，期间收到控制命令则提前推送
+                deadline = last_push + SYSTEM_CONFIG["WEB_PUSH_MIN_INTERVAL"]
+                while (self.running and event is not None and event.type != COMMAND_RECEIVED
+                       and time.monotonic() < deadline):
+                    event = self._offload(subscription.get, deadline - time.monotonic()) or event
+                
+                if event is not None and event.type == COMMAND_RECEIVED:
+                    self.socketio.sleep(SYSTEM_CONFIG.get("WEB_PUSH_COALESCE_WINDOW", 0.1))
+                subscription.drain()
+                self._push_sensor_data()
+                last_push = time.monotonic()
+        finally:
+            subscription.close()
+            if self.server_mode == "eventlet":
+                # tpool只能在运行它的事件循环线程中关闭；
+                # 留给eventlet的atexit钩子在主线程关闭会报 Cannot switch to a different thread
+                tpool.killall()
+                self.loop_stopped.set()
 
     def _run_server(self):
-        """在线程中运行Flask服务器"""
+        """在线程中运行Flask服务器
+        
+        eventlet模式下只有本线程运行协程事件循环（不对整个进程做monkey patch），
+        传感器、控制器和摄像头仍在各自的原生线程中运行；推送循环和视频帧转发
+        作为后台任务运行在本线程的事件循环中，这样emit始终在事件循环内调用。
+        """
         try:
-            self.socketio.run(
-                self.app,
-                host='0.0.0.0',
-                port=SYSTEM_CONFIG["WEB_PORT"],
-                debug=False,
-                use_reloader=False
-            )
+            if self.server_mode == "eventlet":
+                self.socketio.start_background_task(self._data_push_loop)
+                if self.frame_relay is not None:
+                    self.socketio.start_background_task(self.frame_relay.run)
+                self.socketio.run(
+                    self.app,
+                    host='0.0.0.0',
+                    port=SYSTEM_CONFIG["WEB_PORT"],
+                    debug=False,
+                    use_reloader=False,
+                    # 限制同时处理的连接数，控制内存占用
+                    max_size=SYSTEM_CONFIG.get("WEB_MAX_CONNECTIONS", 500)
+                )
+            else:
+                self.socketio.run(
+                    self.app,
+                    host='0.0.0.0',
+                    port=SYSTEM_CONFIG["WEB_PORT"],
+                    debug=False,
+                    use_reloader=False
+                )
         except Exception as e:
             logger.error(f"Web服务器运行错误: {e}")
         
@@ -336,23 +779,30 @@ class WebServer:
         self.server_thread.daemon = True
         self.server_thread.start()
         
-        # 启动数据推送线程
-        self.push_thread = threading.Thread(target=self._data_push_loop)
-        self.push_thread.daemon = True
-        self.push_thread.start()
+        # 启动数据推送线程（eventlet模式下由服务器线程启动后台任务）
+        if self.server_mode == "threading":
+            self.push_thread = threading.Thread(target=self._data_push_loop)
+            self.push_thread.daemon = True
+            self.push_thread.start()
         
-        logger.info(f"Web服务器已启动，访问地址: http://0.0.0.0:{SYSTEM_CONFIG['WEB_PORT']}")
+        logger.info(f"Web服务器已启动({self.server_mode})，访问地址: http://0.0.0.0:{SYSTEM_CONFIG['WEB_PORT']}")
     
     def stop(self):
         """停止Web服务器"""
         logger.info("正在停止Web服务器...")
         self.running = False
+        if self.frame_relay is not None:
+            self.frame_relay.stop()
+        if self.push_subscription is not None:
+            self.push_subscription.close()
         
         # 等待线程结束
         if self.push_thread and self.push_thread.is_alive():
             self.push_thread.join(timeout=2.0)
+        if self.server_mode == "eventlet" and self.server_thread is not None:
+            # 等待推送循环在事件循环线程中关闭tpool
+            self.loop_stopped.wait(timeout=5.0)
         
         # Flask没有优雅的停止方法，只能依赖线程结束
-        # 实际生产环境应使用更健壮的Web服务器如Gunicorn
         
         logger.info("Web服务器已停止")
\ No newline at end of file